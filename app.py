@@ -3,6 +3,7 @@ Main app class for Spotify Guessing Game using customtkinter
 """
 import os
 import random
+import threading
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import spotipy
@@ -12,6 +13,8 @@ from config import *
 # Import our modules
 from spotify_manager import SpotifyManager
 from game_logic import GameLogic, levenshtein_distance
+from search_index import SuggestionCache, SuggestionIndex
+from sharded_matching import ShardedMatcher
 from ui.screens.start_screen import StartScreen
 from ui.screens.game_screen import GameScreen
 from ui.screens.summary_screen import SummaryScreen
@@ -54,6 +57,8 @@ class SpotifyGuessingGameApp(ctk.CTk):
         self.track_artists = []
         self.game_settings = ("Easy", 1.0, False)  # (guessdiff, perreveal, randomstart)
         self.played_songs = []
+        self.suggestion_cache = SuggestionCache()  # Shared by the game screens of one playlist
+        self.library_index = None  # Decoy suggestions from the whole library, shared by all games
         
         # Configure grid layout (4x4)
         self.grid_columnconfigure(0, weight=1)
@@ -62,11 +67,46 @@ class SpotifyGuessingGameApp(ctk.CTk):
         # Start with the start screen
         self.show_start_screen()
         
+        # Index the whole library in the background while the player picks a playlist
+        if LIBRARY_SUGGESTIONS:
+            threading.Thread(target=self._build_library_index, daemon=True).start()
+        
         # Konami code support
         self.konami_sequence = ['Up', 'Up', 'Down', 'Down', 'Left', 'Right', 'Left', 'Right', 'b', 'a']
         self.konami_index = 0
         self.bind('<KeyPress>', self.detect_konami_code)
     
+    def _build_library_index(self):
+        """Build the library-wide suggestion index (runs in a background thread)"""
+        try:
+            track_uris, track_names, track_artists = self.game_logic.get_library_tracks()
+            mapped = self.game_logic.map_library_tracks(track_uris, track_names, track_artists)
+            if mapped is not None and len(mapped) >= SHARDED_MATCHING_MIN_TRACKS:
+                # The workers read the pool from the mapped file; the lists are dropped after this
+                library_index = ShardedMatcher(catalog=mapped)
+            else:
+                full_names = [f"{name} by {artist}" for name, artist in zip(track_names, track_artists)]
+                if len(full_names) >= SHARDED_MATCHING_MIN_TRACKS:
+                    library_index = ShardedMatcher(full_names)
+                else:
+                    library_index = SuggestionIndex(full_names)
+            print(f"Indexed {len(library_index)} library tracks for suggestions")
+            self.after(0, lambda: self._set_library_index(library_index))
+        except Exception as e:
+            print(f"Error building library index: {e}")
+    
+    def _set_library_index(self, library_index):
+        """Start using a built library index, including in a running game"""
+        self.library_index = library_index
+        if isinstance(self.current_screen, GameScreen):
+            self.current_screen.set_library_index(library_index)
+    
+    def destroy(self):
+        """Stop the library index workers before closing the window"""
+        if hasattr(self.library_index, 'close'):
+            self.library_index.close()
+        super().destroy()
+    
     def show_start_screen(self):
         """Switch to the start screen"""
         if self.current_screen:
@@ -75,11 +115,15 @@ class SpotifyGuessingGameApp(ctk.CTk):
         self.current_screen = StartScreen(self, self.game_logic)
         self.current_screen.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
     
-    def show_game_screen(self, track_uris, track_names, track_artists, game_settings):
-        """Switch to the game screen with the selected playlist"""
+    def show_game_screen(self, track_uris, track_names, track_artists, game_settings, catalog=None):
+        """Switch to the game screen with the selected playlist (catalog: TrackCatalog still loading it)"""
         if self.current_screen:
             self.current_screen.destroy()
         
+        # Cached suggestions only stay valid for the same track list
+        if (track_uris, track_names, track_artists) != (self.track_uris, self.track_names, self.track_artists):
+            self.suggestion_cache.clear()
+        
         self.track_uris = track_uris
         self.track_names = track_names
         self.track_artists = track_artists
@@ -93,7 +137,10 @@ class SpotifyGuessingGameApp(ctk.CTk):
             self.track_uris,
             self.track_names,
             self.track_artists,
-            self.game_settings
+            self.game_settings,
+            suggestion_cache=self.suggestion_cache,
+            library_index=self.library_index,
+            catalog=catalog
         )
         self.current_screen.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
         
@@ -0,0 +1,289 @@
+"""
+Benchmark - Times suggestion filtering and guess checking on synthetic catalogs
+
+Usage:
+    python benchmark.py                    # run and compare against the stored baseline
+    python benchmark.py --save-baseline    # run and store the results as the new baseline
+    python benchmark.py --sizes 1000 10000 # only benchmark some catalog sizes
+    python benchmark.py --backend python   # benchmark the pure-Python distance backend
+    python benchmark.py --parity           # check that all distance backends agree
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from config import *
+from game_logic import (
+    DISTANCE_BACKENDS, GameLogic, get_distance_backend, levenshtein_distance,
+    normalize_key, set_distance_backend
+)
+from search_index import SuggestionIndex
+
+MODES = ["Normal", "Hard", "Harder", "Expert"]
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_TOLERANCE = 1.5  # Slowdown factor that counts as a regression
+MIN_REGRESSION_MS = 0.05  # Smaller absolute slowdowns are timer noise
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+TITLE_WORDS = [
+    "love", "night", "heart", "fire", "baby", "dance", "dream", "light", "world",
+    "time", "girl", "song", "blue", "rain", "summer", "wild", "young", "gold",
+    "street", "home", "forever", "midnight", "city", "ocean", "highway", "angel",
+    # Accented, non-Latin and mixed-script words as found in real libraries
+    "café", "señorita", "déjà", "vu", "über", "niño", "corazón", "amélie",
+    "naïve", "façade", "straße", "ночь", "любовь", "東京", "夜", "사랑", "♥",
+]
+ARTIST_NAMES = [
+    "Adele", "Drake", "Beyoncé", "Queen", "Coldplay", "Rosalía", "Björk",
+    "Sigur Rós", "Daft Punk", "Motörhead", "Mötley Crüe", "Céline Dion",
+    "Zemfira", "宇多田ヒカル", "BTS", "The Weeknd", "Bad Bunny", "Måneskin",
+]
+TYPO_CHARS = "abcdefghijklmnopqrstuvwxyzéü "
+
+
+def make_catalog(size, rng):
+    """Return synthetic (track_names, track_artists) lists of the given size"""
+    track_names = []
+    track_artists = []
+    for _ in range(size):
+        words = [rng.choice(TITLE_WORDS) for _ in range(rng.choice((1, 2, 2, 3, 3, 4, 5)))]
+        track_names.append(" ".join(words).title())
+        track_artists.append(rng.choice(ARTIST_NAMES))
+    return track_names, track_artists
+
+
+def make_typo(text, rng):
+    """Apply one random deletion, substitution, insertion or transposition"""
+    if len(text) < 2:
+        return text
+    i = rng.randrange(len(text) - 1)
+    kind = rng.random()
+    if kind < 0.3:
+        return text[:i] + text[i + 1:]
+    if kind < 0.6:
+        return text[:i] + rng.choice(TYPO_CHARS) + text[i + 1:]
+    if kind < 0.85:
+        return text[:i] + rng.choice(TYPO_CHARS) + text[i:]
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def make_guesses(track_names, track_artists, rng, count):
+    """Return (index, guess) pairs: exact, typo'd, title-only and wrong guesses"""
+    guesses = []
+    for _ in range(count):
+        index = rng.randrange(len(track_names))
+        title = track_names[index]
+        full = f"{title} by {track_artists[index]}"
+        kind = rng.random()
+        if kind < 0.25:
+            guess = full
+        elif kind < 0.5:
+            guess = title
+        elif kind < 0.7:
+            guess = make_typo(title, rng)
+        elif kind < 0.85:
+            guess = make_typo(make_typo(full, rng), rng)
+        else:
+            guess = track_names[rng.randrange(len(track_names))]
+        guesses.append((index, guess))
+    return guesses
+
+
+def median_ms(func, args_list):
+    """Return the median wall time of func(*args) over args_list, in milliseconds"""
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def bench_levenshtein(rng):
+    """Time bounded and unbounded distance on title-sized pairs"""
+    pairs = []
+    for _ in range(2000):
+        title = " ".join(rng.choice(TITLE_WORDS) for _ in range(3))
+        pairs.append((make_typo(title, rng), title))
+
+    return {
+        "levenshtein/unbounded_ms": median_ms(levenshtein_distance, pairs),
+        "levenshtein/bounded_ms": median_ms(
+            lambda a, b: levenshtein_distance(a, b, max_distance=2), pairs
+        ),
+    }
+
+
+def bench_guesses(game_logic, track_names, track_artists, rng):
+    """Time GameLogic.check_guess for every mode"""
+    results = {}
+    guesses = make_guesses(track_names, track_artists, rng, 500)
+
+    def check(index, guess):
+        game_logic.current_track_name = track_names[index]
+        game_logic.current_track_artist = track_artists[index]
+        game_logic.check_guess(guess)
+
+    for mode in MODES:
+        game_logic.set_game_mode(mode)
+        # check_guess prints debug output for every call
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[f"guess/{mode}_ms"] = median_ms(check, guesses)
+    return results
+
+
+def bench_catalog(game_logic, size, rng):
+    """Time index building and per-keystroke suggestion filtering for one catalog size"""
+    results = {}
+    track_names, track_artists = make_catalog(size, rng)
+    full_names = [f"{name} by {artist}" for name, artist in zip(track_names, track_artists)]
+
+    start = time.perf_counter()
+    index = SuggestionIndex(full_names)
+    results[f"index_build/{size}_ms"] = (time.perf_counter() - start) * 1000
+
+    # Typing sessions: each guess typed one character at a time
+    keystrokes = []
+    for _, guess in make_guesses(track_names, track_artists, rng, 30):
+        keystrokes.extend(normalize_key(guess[:i]) for i in range(1, len(guess) + 1))
+    keystrokes = [query for query in keystrokes if query]
+
+    for mode in MODES:
+        rule = game_logic.get_game_mode_rules(mode)
+        results[f"keystroke/{mode}/{size}_ms"] = median_ms(
+            lambda query: index.match(rule, query, limit=MAX_SUGGESTIONS),
+            [(query,) for query in keystrokes]
+        )
+    return results
+
+
+def run_benchmarks(sizes, seed):
+    """Run every benchmark and return a mapping of benchmark name -> milliseconds"""
+    rng = random.Random(seed)
+    game_logic = GameLogic(None)
+
+    results = bench_levenshtein(rng)
+    track_names, track_artists = make_catalog(1000, rng)
+    results.update(bench_guesses(game_logic, track_names, track_artists, rng))
+    for size in sizes:
+        # Seed per size so a catalog doesn't depend on which other sizes ran
+        results.update(bench_catalog(game_logic, size, random.Random(seed * 1000003 + size)))
+    return results
+
+
+def check_parity(seed):
+    """
+    Return a list of disagreements between the distance backends on guess
+    checking and suggestion matching, for every mode
+    """
+    rng = random.Random(seed)
+    game_logic = GameLogic(None)
+    track_names, track_artists = make_catalog(2000, rng)
+    full_names = [f"{name} by {artist}" for name, artist in zip(track_names, track_artists)]
+    guesses = make_guesses(track_names, track_artists, rng, 2000)
+    queries = [normalize_key(guess) for _, guess in guesses[:200]]
+
+    outcomes = {}
+    for backend in DISTANCE_BACKENDS:
+        set_distance_backend(backend)
+        index = SuggestionIndex(full_names)
+        outcome = {}
+        for mode in MODES:
+            game_logic.set_game_mode(mode)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for number, (track, guess) in enumerate(guesses):
+                    game_logic.current_track_name = track_names[track]
+                    game_logic.current_track_artist = track_artists[track]
+                    outcome[("guess", mode, number)] = game_logic.check_guess(guess)
+            rule = game_logic.get_game_mode_rules(mode)
+            for query in queries:
+                outcome[("match", mode, query)] = index.match(rule, query)
+        outcomes[backend] = outcome
+
+    disagreements = []
+    reference = outcomes.pop("python")
+    for backend, outcome in outcomes.items():
+        for key, expected in reference.items():
+            if outcome[key] != expected:
+                disagreements.append((backend, key, expected, outcome[key]))
+    return disagreements
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return (name, baseline_ms, current_ms) for benchmarks slower than allowed"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or current - previous < MIN_REGRESSION_MS:
+            continue
+        if current > previous * tolerance:
+            regressions.append((name, previous, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suggestion matching and guess checking")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="catalog sizes to benchmark")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for the synthetic data")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown factor before a benchmark counts as a regression")
+    parser.add_argument("--backend", choices=["auto"] + sorted(DISTANCE_BACKENDS), default="auto",
+                        help="string distance backend to benchmark")
+    parser.add_argument("--parity", action="store_true",
+                        help="check that every distance backend accepts and suggests the same tracks")
+    args = parser.parse_args()
+
+    if args.parity:
+        if len(DISTANCE_BACKENDS) < 2:
+            print("Only the python distance backend is available; install rapidfuzz to compare.")
+            return
+        disagreements = check_parity(args.seed)
+        for backend, key, expected, actual in disagreements[:20]:
+            print(f"MISMATCH {backend} {key}: python {expected!r}, {backend} {actual!r}")
+        if disagreements:
+            sys.exit(1)
+        print(f"Backends agree: {', '.join(sorted(DISTANCE_BACKENDS))}")
+        return
+
+    set_distance_backend(args.backend)
+    print(f"Distance backend: {get_distance_backend()}")
+
+    results = run_benchmarks(args.sizes, args.seed)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    for name, value in results.items():
+        previous = baseline.get(name)
+        change = f"  (baseline {previous:.3f})" if previous is not None else ""
+        print(f"{name:<32} {value:10.3f} ms{change}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not baseline:
+        print("No baseline found; run with --save-baseline to create one.")
+        return
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for name, previous, current in regressions:
+        print(f"REGRESSION {name}: {previous:.3f} ms -> {current:.3f} ms")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Catalog Cache - On-disk SQLite cache of playlist tracks, keyed by snapshot_id
+"""
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from config import *
+
+SCHEMA_VERSION = 2  # Bump when the tables change; older caches are dropped
+LIKED_SONGS_ID = "liked_songs"  # Playlist ID the liked songs are stored under
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    playlist_id TEXT PRIMARY KEY,
+    snapshot_id TEXT NOT NULL,
+    reconciled_at REAL
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    playlist_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    uri TEXT NOT NULL,
+    name TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    artists TEXT NOT NULL,
+    album TEXT NOT NULL,
+    duration_ms INTEGER,
+    added_at TEXT,
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
+"""
+
+
+def track_rows(items):
+    """
+    Return the cache rows (uri, name, artist, artists, album, duration_ms,
+    added_at) of playlist or saved-track items, skipping removed tracks
+    """
+    rows = []
+    for item in items:
+        track = item.get('track')
+        if not track or not track.get('uri'):
+            continue
+        artists = [artist['name'] for artist in track.get('artists') or ()]
+        rows.append((
+            track['uri'],
+            track['name'],
+            artists[0] if artists else "",
+            ", ".join(artists),
+            (track.get('album') or {}).get('name', ""),
+            track.get('duration_ms'),
+            item.get('added_at'),
+        ))
+    return rows
+
+
+class CatalogCache:
+    """
+    Extracted playlist tracks stored per playlist ID together with the
+    playlist's snapshot_id. A playlist is served from the cache only while
+    Spotify still reports the same snapshot. Liked Songs have no snapshot;
+    they are stored newest first with the time of their last full reload.
+    Shared by the game and the playlist viewer; every call opens its own
+    connection, so any thread can use it.
+    """
+
+    def __init__(self, path=CATALOG_CACHE_FILE):
+        self.path = path
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open a connection, creating (or resetting an outdated) database on first use"""
+        with self._lock:
+            if not self._ready:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            if not self._ready:
+                if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    connection.executescript("DROP TABLE IF EXISTS playlists; DROP TABLE IF EXISTS tracks;")
+                    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                connection.executescript(SCHEMA)
+                self._ready = True
+            return connection
+
+    def _read(self, playlist_id, snapshot_id=None):
+        """Return (rows, reconciled_at) of a cached playlist, or None if missing or another snapshot"""
+        try:
+            with closing(self._connect()) as connection:
+                row = connection.execute(
+                    "SELECT snapshot_id, reconciled_at FROM playlists WHERE playlist_id = ?", (playlist_id,)
+                ).fetchone()
+                if row is None or (snapshot_id is not None and row[0] != snapshot_id):
+                    return None
+                rows = connection.execute(
+                    "SELECT uri, name, artist, artists, album, duration_ms, added_at FROM tracks "
+                    "WHERE playlist_id = ? ORDER BY position",
+                    (playlist_id,)
+                ).fetchall()
+                return rows, row[1]
+        except Exception as e:
+            print(f"Error reading catalog cache: {e}")
+            return None
+
+    def get(self, playlist_id, snapshot_id):
+        """Return the cached rows of a playlist snapshot in playlist order, or None"""
+        cached = self._read(playlist_id, snapshot_id)
+        return cached[0] if cached is not None else None
+
+    def put(self, playlist_id, snapshot_id, rows, reconciled_at=None):
+        """Store the rows of a playlist snapshot, replacing what was cached for the playlist"""
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute("DELETE FROM tracks WHERE playlist_id = ?", (playlist_id,))
+                connection.execute(
+                    "INSERT OR REPLACE INTO playlists (playlist_id, snapshot_id, reconciled_at) VALUES (?, ?, ?)",
+                    (playlist_id, snapshot_id, reconciled_at)
+                )
+                connection.executemany(
+                    "INSERT INTO tracks "
+                    "(playlist_id, position, uri, name, artist, artists, album, duration_ms, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((playlist_id, position) + tuple(row) for position, row in enumerate(rows))
+                )
+        except Exception as e:
+            print(f"Error writing catalog cache: {e}")
+
+    def get_liked_songs(self):
+        """Return (rows newest first, time of the last full reload) of the liked songs, or None"""
+        return self._read(LIKED_SONGS_ID)
+
+    def get_liked_songs_state(self):
+        """Return (count, newest added_at, time of the last full reload) of the cached liked songs, or None"""
+        try:
+            with closing(self._connect()) as connection:
+                row = connection.execute(
+                    "SELECT reconciled_at FROM playlists WHERE playlist_id = ?", (LIKED_SONGS_ID,)
+                ).fetchone()
+                if row is None:
+                    return None
+                count, newest_added_at = connection.execute(
+                    "SELECT COUNT(*), MIN(CASE WHEN position = 0 THEN added_at END) FROM tracks "
+                    "WHERE playlist_id = ?",
+                    (LIKED_SONGS_ID,)
+                ).fetchone()
+                return count, newest_added_at, row[0]
+        except Exception as e:
+            print(f"Error reading catalog cache: {e}")
+            return None
+
+    def put_liked_songs(self, rows, reconciled_at):
+        """Store the liked songs (newest first) and when they were last fully reloaded"""
+        self.put(LIKED_SONGS_ID, "", rows, reconciled_at)
@@ -1,4 +1,5 @@
 # config.py
+import os
 
 # === Configurable Variables ===
 
@@ -15,4 +16,19 @@ BACKGROUND_COLOR = "#323232"  # Default background color
 MAX_GUESS_COUNT = 3  # Maximum number of guesses per song
 MAX_LIVES = 3  # Number of lives the player starts with
 VOLUME_LEVEL = 80  # Desired volume level (0-100)
+MAX_SUGGESTIONS = 10  # Number of suggestions shown under the guess entry
+SUGGESTION_DEBOUNCE_MS = 75  # Pause in typing before suggestions are recomputed
+NORMALIZE_CACHE_SIZE = 4096  # Memoized comparison keys of guesses and typed queries
+SUGGESTION_CACHE_SIZE = 2048  # Suggestion lists remembered per (mode, query, playlist)
+SHARDED_MATCHING_MIN_TRACKS = 50000  # Catalogs this large are matched in worker processes
+MATCHING_PROCESSES = 4  # Worker processes used for sharded matching
+DISTANCE_BACKEND = "auto"  # "rapidfuzz", "python", or "auto" to use rapidfuzz when installed
+PHONETIC_SUGGESTIONS = True  # Also suggest titles that sound like the guess (Normal and Hard)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "spotify-guessing-game")  # Persisted indexes and catalogs
+CATALOG_CACHE_FILE = os.path.join(CACHE_DIR, "catalog.sqlite3")  # Playlist tracks cached per snapshot
+INDEX_CACHE_MIN_TRACKS = 2000  # Suggestion indexes of playlists this large are saved to disk
+LIBRARY_SUGGESTIONS = False  # Also suggest tracks from all your playlists and Liked Songs as decoys
+PAGE_FETCH_WORKERS = 8  # Concurrent requests when loading paginated Spotify lists
+MAPPED_CATALOG_MIN_TRACKS = 20000  # Liked Songs and library pools this large are read from a memory-mapped file
+LIKED_SONGS_RECONCILE_HOURS = 24  # Cached Liked Songs are fully reloaded this often to catch unlikes
 # =============================
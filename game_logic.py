@@ -1,40 +1,369 @@
 """
 Game Logic - Core gameplay logic for the Spotify Guessing Game
 """
+import os
 import re
 import random
+import time
+import unicodedata
+from functools import lru_cache, partial
 from config import *
-from spotify_manager import SpotifyManager
+from catalog_cache import LIKED_SONGS_ID, CatalogCache, track_rows
+from mapped_catalog import LIBRARY_ID, catalog_path, content_snapshot, open_catalog, save_catalog
+from spotify_manager import PLAYLIST_TRACK_FIELDS, SpotifyManager, fetch_all_pages, iter_pages
+from track_catalog import TrackCatalog
 
-def levenshtein_distance(s1, s2):
+try:
+    from rapidfuzz import process as rapidfuzz_process
+    from rapidfuzz.distance import Levenshtein as RapidfuzzLevenshtein
+except ImportError:
+    rapidfuzz_process = None
+    RapidfuzzLevenshtein = None
+
+def _python_levenshtein_distance(s1, s2, max_distance=None):
     """
     Returns the Levenshtein distance between two strings s1 and s2.
     The distance is the number of edits (insertions, deletions, substitutions)
     required to transform s1 into s2.
+
+    Uses the Myers/Hyyro bit-vector algorithm, so each character of the longer
+    string costs a handful of integer operations instead of a full DP row.
+    If max_distance is given, scanning stops as soon as the distance is known
+    to exceed it and max_distance + 1 is returned instead.
     """
     if s1 == s2:
         return 0
-    if len(s1) == 0:
-        return len(s2)
-    if len(s2) == 0:
-        return len(s1)
-
-    dp = [[0] * (len(s2) + 1) for _ in range(len(s1) + 1)]
-
-    for i in range(len(s1) + 1):
-        dp[i][0] = i
-    for j in range(len(s2) + 1):
-        dp[0][j] = j
-
-    for i in range(1, len(s1) + 1):
-        for j in range(1, len(s2) + 1):
-            cost = 0 if s1[i - 1] == s2[j - 1] else 1
-            dp[i][j] = min(
-                dp[i - 1][j] + 1,     # deletion
-                dp[i][j - 1] + 1,     # insertion
-                dp[i - 1][j - 1] + cost  # substitution
-            )
-    return dp[len(s1)][len(s2)]
+
+    # Use the shorter string as the pattern to keep the bit vectors small
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    m = len(s1)
+    n = len(s2)
+
+    if max_distance is not None and n - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return n
+
+    # Bitmask of pattern positions for every character in the pattern
+    peq = {}
+    for i, char in enumerate(s1):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full  # vertical +1 deltas
+    mv = 0     # vertical -1 deltas
+    score = m
+
+    for j, char in enumerate(s2):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        # Each remaining column can lower the score by at most one
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+
+    if max_distance is not None and score > max_distance:
+        return max_distance + 1
+    return score
+
+def _python_extract_within(query, choices, max_distance):
+    """Return the indexes of choices within max_distance edits of query"""
+    return [
+        index for index, choice in enumerate(choices)
+        if _python_levenshtein_distance(query, choice, max_distance=max_distance) <= max_distance
+    ]
+
+def _rapidfuzz_levenshtein_distance(s1, s2, max_distance=None):
+    """rapidfuzz Levenshtein distance; score_cutoff returns max_distance + 1 when exceeded"""
+    return RapidfuzzLevenshtein.distance(s1, s2, score_cutoff=max_distance)
+
+def _rapidfuzz_extract_within(query, choices, max_distance):
+    """Return the indexes of choices within max_distance edits of query"""
+    matches = rapidfuzz_process.extract(
+        query, choices, scorer=RapidfuzzLevenshtein.distance,
+        processor=None, score_cutoff=max_distance, limit=None
+    )
+    return [index for _, _, index in matches]
+
+# Backend name -> (distance function, catalog extraction function)
+DISTANCE_BACKENDS = {"python": (_python_levenshtein_distance, _python_extract_within)}
+if RapidfuzzLevenshtein is not None:
+    DISTANCE_BACKENDS["rapidfuzz"] = (_rapidfuzz_levenshtein_distance, _rapidfuzz_extract_within)
+
+_distance_backend = None
+_distance = None
+_extract_within = None
+
+def set_distance_backend(name):
+    """
+    Selects the string distance backend: "rapidfuzz", "python", or "auto"
+    for rapidfuzz when it is installed. Both give identical distances.
+    """
+    global _distance_backend, _distance, _extract_within
+    if name == "auto":
+        name = "rapidfuzz" if "rapidfuzz" in DISTANCE_BACKENDS else "python"
+    if name not in DISTANCE_BACKENDS:
+        raise ValueError(f"Distance backend not available: {name}")
+    _distance_backend = name
+    _distance, _extract_within = DISTANCE_BACKENDS[name]
+
+def get_distance_backend():
+    """Returns the name of the active string distance backend"""
+    return _distance_backend
+
+def levenshtein_distance(s1, s2, max_distance=None):
+    """
+    Returns the Levenshtein distance between s1 and s2 using the active backend.
+    If max_distance is given, max_distance + 1 is returned for anything farther.
+    """
+    return _distance(s1, s2, max_distance)
+
+def extract_within(query, choices, max_distance):
+    """Returns the indexes of choices within max_distance edits of query, using the active backend"""
+    return _extract_within(query, choices, max_distance)
+
+set_distance_backend(DISTANCE_BACKEND)
+
+# Punctuation dropped within words ("Don't", "R.E.M.", "Jay-Z"); any other
+# punctuation separates words, so "Love/Hate" keys as "love hate"
+JOINING_PUNCTUATION = "'\u2018\u2019.-\u2010"
+
+# Scripts whose combining marks are accents that fold away ("é" keys as "e");
+# marks elsewhere, such as kana voicing marks, are part of the letter
+FOLDED_SCRIPTS = ("LATIN", "GREEK", "CYRILLIC")
+
+def _part_key(text):
+    """Returns the key of a title or artist on its own (see canonical_key)"""
+    kept = []
+    base = ""
+    for char in unicodedata.normalize("NFKD", text):
+        if unicodedata.combining(char):
+            if unicodedata.name(base, "").startswith(FOLDED_SCRIPTS):
+                continue
+        else:
+            base = char
+            if char in JOINING_PUNCTUATION:
+                continue
+            if unicodedata.category(char).startswith("P"):
+                char = " "
+        kept.append(char)
+    # Re-compose what is left, so Hangul jamo rejoin into syllables
+    composed = unicodedata.normalize("NFC", "".join(kept))
+    # Text that is all punctuation keys as itself rather than as ""
+    return " ".join(composed.casefold().split()) or " ".join(text.casefold().split())
+
+def canonical_key(text):
+    """
+    Returns the canonical comparison key for a title, artist or guess:
+    NFKD-decomposed, Latin, Greek and Cyrillic accents folded, re-composed,
+    casefolded, punctuation dropped or turned into spaces and whitespace
+    collapsed, so "Beyoncé" and "beyonce" compare equal. Each side of " by " is keyed on its own, so a
+    punctuation-only title or artist still has a key.
+    """
+    return " ".join(" by ".join(_part_key(part) for part in text.split(" by ")).split())
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_key(text):
+    """
+    Returns canonical_key(text), memoized for guesses and typed queries,
+    which repeat while the player types. Catalog keys are computed once
+    into TrackFeatures instead.
+    """
+    return canonical_key(text)
+
+def key_prefix_length(text, key, trailing_punctuation=True):
+    """
+    Returns the length of the longest prefix of a display string whose
+    canonical key is a prefix of key, so a normalized completion can be cut
+    back out of the original text. Unless key ends in a space, trailing
+    spaces (and with trailing_punctuation=False, anything else the key
+    leaves out) are left after the cut.
+    """
+    length = 0
+    for end in range(1, len(text) + 1):
+        if not key.startswith(canonical_key(text[:end])):
+            break
+        length = end
+    if not key.endswith(" "):
+        while length and (
+            text[length - 1].isspace() if trailing_punctuation
+            else canonical_key(text[:length - 1]) == canonical_key(text[:length])
+        ):
+            length -= 1
+    return length
+
+# Simplified Metaphone: ordered rewrites turning one word into a sound key
+PHONETIC_RULES = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r"^(?:kn|gn|pn)", "n"),
+    (r"^wr", "r"),
+    (r"^ps", "s"),
+    (r"^x", "s"),
+    (r"^who", "ho"),          # "whole" sounds like "hole"
+    (r"^wh", "w"),
+    (r"mb$", "m"),
+    (r"(.)\1+", r"\1"),      # Doubled letters sound like one
+    (r"tch", "ch"),
+    (r"sch", "sk"),
+    (r"(?:ch|sh)", "X"),      # Uppercase codes can't be rewritten by later rules
+    (r"ti(?=[ao])", "X"),     # "nation"
+    (r"th", "0"),
+    (r"ph", "f"),
+    (r"ck", "k"),
+    (r"c(?=[eiy])", "s"),
+    (r"[cq]", "k"),
+    (r"x", "ks"),
+    (r"z", "s"),
+    (r"dg(?=[eiy])", "j"),
+    (r"d", "t"),
+    (r"gh(?![aeiou])", ""),   # "night"
+    (r"g(?=[eiy])", "j"),
+    (r"v", "f"),
+    (r"[wyh](?![aeiou])", ""),
+    (r"^[aeiou]", "a"),
+    (r"(?<!^)[aeiouy]", ""),
+    (r"(.)\1+", r"\1"),
+)]
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _phonetic_word(word):
+    """Returns the sound key of one word (words repeat a lot across titles)"""
+    for pattern, replacement in PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+def phonetic_key(text):
+    """
+    Returns a sound-alike key for a normalized title, so that e.g.
+    "hole in the wall" and "whole in the wall" share a key.
+    Characters outside a-z are kept as they are.
+    """
+    return " ".join(filter(None, map(_phonetic_word, text.split())))
+
+class TrackFeatures:
+    """Normalized fields of one "title by artist" entry, computed once at load"""
+    
+    __slots__ = ("full", "title", "title_length")
+    
+    def __init__(self, full_name, title=None):
+        """Key a "title by artist" string (pass title when the title itself may contain "by")"""
+        self.full = canonical_key(full_name)
+        self.title = canonical_key(title) if title is not None else self.full.split(" by ")[0]
+        self.title_length = len(self.title)
+
+class ModeRule:
+    """
+    Suggestion filter for one game mode. matches() runs against precomputed
+    TrackFeatures; calling the rule with a raw item string still works.
+    """
+    
+    # "title" or "full" when the rule can only accept prefixes of that field
+    prefix_scope = None
+    # True when titles that sound like the query are accepted as well
+    phonetic = False
+    
+    def matches(self, query, track):
+        """Return True if the track should be suggested for query"""
+        raise NotImplementedError
+    
+    def max_title_distance(self, query):
+        """Return the largest title edit distance the rule can accept, or None"""
+        return None
+    
+    def __call__(self, query, item):
+        return self.matches(query, TrackFeatures(item))
+
+class NormalRule(ModeRule):
+    """Normal mode: Show partial matches with Levenshtein distance <= 2"""
+    
+    phonetic = PHONETIC_SUGGESTIONS
+    
+    def max_title_distance(self, query):
+        # For shorter queries (1-3 chars) allow fewer errors,
+        # for longer ones scale with the query length
+        if len(query) <= 3:
+            return len(query) - 1
+        return min(2, len(query) // 3)
+    
+    def matches(self, query, track):
+        # Substring anywhere (this also covers title and word prefixes)
+        if query in track.full:
+            return True
+        
+        # Otherwise the title has to be close to the query
+        max_distance = self.max_title_distance(query)
+        if abs(track.title_length - len(query)) > max_distance:
+            return False
+        return levenshtein_distance(query, track.title, max_distance=max_distance) <= max_distance
+
+class HardRule(ModeRule):
+    """Hard mode: Only show exact matches with <= 1 error in the title"""
+    
+    phonetic = PHONETIC_SUGGESTIONS
+    
+    def max_title_distance(self, query):
+        return 1 if len(query) > 3 else None
+    
+    def matches(self, query, track):
+        # Prefix matching
+        if track.title.startswith(query):
+            return True
+        
+        # Short queries - show more
+        if len(query) <= 3:
+            return query in track.title
+        
+        # Levenshtein matching with restrictions
+        if query == track.full:
+            return True
+        if abs(track.title_length - len(query)) > 1:
+            return False
+        return levenshtein_distance(query, track.title, max_distance=1) <= 1
+
+class HarderRule(ModeRule):
+    """Harder mode: Only show if exact song name match"""
+    
+    prefix_scope = "title"
+    
+    def matches(self, query, track):
+        # Match beginning of title, only exact match for longer queries
+        if len(query) <= 3:
+            return track.title.startswith(query)
+        return query == track.title
+
+class ExpertRule(ModeRule):
+    """Expert mode: Only show if exact 'title by artist' match"""
+    
+    prefix_scope = "full"
+    
+    def matches(self, query, track):
+        # Even in expert mode, show suggestions for short queries
+        if len(query) <= 2:
+            return track.full.startswith(query)
+        return query == track.full
+
+MODE_RULES = {
+    "Normal": NormalRule(),
+    "Hard": HardRule(),
+    "Harder": HarderRule(),
+    "Expert": ExpertRule(),
+    # For backward compatibility
+    "HarderHarder": ExpertRule()
+}
 
 class GameLogic:
     """Manages the core game logic for the Spotify Guessing Game"""
@@ -45,25 +374,33 @@ class GameLogic:
         self.current_track = None
         self.current_track_name = None
         self.current_track_artist = None
+        self.current_features = None  # (full name, TrackFeatures) of the current track
         self.game_settings = ("Easy", 1.0, False)  # (guessdiff, perrevel, randomstart)
         self.track_uris = []
         self.track_names = []
         self.track_artists = []
+        self.track_durations = {}  # Track URI -> duration in seconds, recorded while loading
+        self.catalog_cache = CatalogCache()  # Playlist tracks stored per snapshot_id, plus Liked Songs
+        # (playlist_id, snapshot_id, track_uris) of the last snapshot-versioned load
+        self.loaded_snapshot = None
+        self.mapped_catalog = None  # MappedCatalog of the last very large Liked Songs load
+    
+    def snapshot_of(self, track_uris):
+        """Return (playlist_id, snapshot_id) if track_uris came from the last playlist load, else (None, None)"""
+        if self.loaded_snapshot is not None and self.loaded_snapshot[2] is track_uris:
+            return self.loaded_snapshot[:2]
+        return None, None
+    
+    def mapped_duration(self, track_uris, index):
+        """Return the duration of track_uris[index] if track_uris came from the mapped catalog, else None"""
+        mapped = self.mapped_catalog_of(track_uris)
+        return mapped.duration(index) if mapped is not None else None
     
     def get_user_playlists(self):
         """Get the user's playlists including cover images"""
-        playlists = []
-        limit = 50
-        offset = 0
-        
         try:
-            while True:
-                response = self.sp.current_user_playlists(limit=limit, offset=offset)
-                playlists.extend(response['items'])
-                if len(response['items']) < limit:
-                    break
-                offset += limit
-                
+            playlists = fetch_all_pages(self.sp.current_user_playlists, 50)
+            
             # Sort playlists by name
             playlists.sort(key=lambda p: p['name'].lower())
             
@@ -107,21 +444,14 @@ class GameLogic:
         # Handle regular playlist by name
         return self._get_regular_playlist_tracks(playlist_name)
     
-    def _get_liked_songs(self):
-        """Get the user's liked songs"""
-        tracks = []
-        limit = 50
-        offset = 0
-        
+    def _get_liked_songs(self, mapped=True):
+        """Get the user's liked songs (mapped=True: from the mapped catalog of a large, unchanged library)"""
         try:
-            while True:
-                response = self.sp.current_user_saved_tracks(limit=limit, offset=offset)
-                tracks.extend(response['items'])
-                if len(response['items']) < limit:
-                    break
-                offset += limit
-            
-            return self._extract_track_info(tracks)
+            catalog = self.open_mapped_liked_songs() if mapped else None
+            if catalog is not None:
+                self.mapped_catalog = catalog
+                return catalog.track_uris, catalog.track_names, catalog.track_artists
+            return self._collect_track_info(self.iter_liked_song_pages())
         except Exception as e:
             print(f"Error getting liked songs: {e}")
             return [], [], []
@@ -147,36 +477,232 @@ class GameLogic:
             print(f"Error getting playlist tracks: {e}")
             return [], [], []
     
-    def _get_playlist_tracks_by_id(self, playlist_id):
-        """Get tracks from a playlist by ID"""
-        tracks = []
-        limit = 100
+    def get_library_tracks(self):
+        """Get the distinct tracks of all the user's playlists plus Liked Songs"""
+        track_uris = []
+        track_names = []
+        track_artists = []
+        seen = set()
+        
+        # Lists rather than the mapped catalog, which belongs to the game's track lists
+        sources = [self._get_liked_songs(mapped=False)]
+        for playlist in self.get_user_playlists():
+            try:
+                pages = self.iter_playlist_track_pages(playlist['id'], playlist.get('snapshot_id'))
+                sources.append(self._collect_track_info(pages))
+            except Exception as e:
+                print(f"Error getting tracks of playlist {playlist.get('name')}: {e}")
+        
+        for uris, names, artists in sources:
+            for uri, name, artist in zip(uris, names, artists):
+                if uri not in seen:
+                    seen.add(uri)
+                    track_uris.append(uri)
+                    track_names.append(name)
+                    track_artists.append(artist)
+        
+        return track_uris, track_names, track_artists
+    
+    def iter_liked_song_pages(self):
+        """
+        Yield (track_uris, track_names, track_artists) for each page of liked songs.
+        Cached liked songs are synced by fetching only the songs liked since, and
+        served in one page; they are fully reloaded every
+        LIKED_SONGS_RECONCILE_HOURS or when the synced count doesn't add up.
+        """
+        cached = self.catalog_cache.get_liked_songs()
+        if cached is not None:
+            rows, reconciled_at = cached
+            if reconciled_at and time.time() - reconciled_at < LIKED_SONGS_RECONCILE_HOURS * 3600:
+                rows = self._sync_liked_songs(rows, reconciled_at)
+                if rows is not None:
+                    track_info = self._track_info_from_rows(rows)
+                    yield track_info
+                    self._map_liked_songs(*track_info, rows, reconciled_at)
+                    return
+        
+        fetched = []
+        pages = []
+        reconciled_at = time.time()
+        for items in iter_pages(self.sp.current_user_saved_tracks, 50):
+            rows = track_rows(items)
+            fetched.extend(rows)
+            pages.append(self._track_info_from_rows(rows))
+            yield pages[-1]
+        
+        self.catalog_cache.put_liked_songs(fetched, reconciled_at)
+        if len(fetched) >= MAPPED_CATALOG_MIN_TRACKS:
+            self._map_liked_songs(*self._collect_track_info(pages), fetched, reconciled_at)
+    
+    def _sync_liked_songs(self, cached_rows, reconciled_at):
+        """
+        Merge the songs liked since the cache was written into its rows and
+        return them newest first, or None if a full reload is needed
+        """
+        newest = cached_rows[0][6] if cached_rows else None
+        if not newest:
+            return None
+        
+        # Saved tracks come newest first, so stop at the first page that
+        # reaches back past the newest cached song
+        new_rows = []
         offset = 0
+        while True:
+            response = self.sp.current_user_saved_tracks(limit=50, offset=offset)
+            if offset == 0:
+                total = response.get('total')
+            items = response.get('items') or []
+            rows = track_rows(items)
+            new_rows.extend(row for row in rows if row[6] and row[6] >= newest)
+            if len(items) < 50 or any(row[6] and row[6] < newest for row in rows):
+                break
+            offset += 50
+        
+        # Songs liked in the same second as the newest cached one may already be
+        # cached; re-liked songs come back newer and move to the front
+        cached_uris = {row[0] for row in cached_rows}
+        new_rows = [row for row in new_rows if row[6] > newest or row[0] not in cached_uris]
+        new_uris = {row[0] for row in new_rows}
+        merged = new_rows + [row for row in cached_rows if row[0] not in new_uris]
+        
+        # Unliked songs only show up in the total; let a full reload remove them
+        if total is not None and total != len(merged):
+            return None
+        if new_rows:
+            self.catalog_cache.put_liked_songs(merged, reconciled_at)
+        return merged
+    
+    def iter_playlist_track_pages(self, playlist_id, snapshot_id=None):
+        """
+        Yield (track_uris, track_names, track_artists) for each page of a playlist.
+        With a snapshot_id the catalog cache serves an unchanged playlist in one
+        page, and a fully fetched playlist is stored for next time.
+        """
+        if snapshot_id:
+            rows = self.catalog_cache.get(playlist_id, snapshot_id)
+            if rows is not None:
+                yield self._track_info_from_rows(rows)
+                return
+        
+        fetched = []
+        fetch_page = partial(self.sp.playlist_items, playlist_id, fields=PLAYLIST_TRACK_FIELDS)
+        for items in iter_pages(fetch_page, 100):
+            rows = track_rows(items)
+            fetched.extend(rows)
+            yield self._track_info_from_rows(rows)
+        
+        if snapshot_id:
+            self.catalog_cache.put(playlist_id, snapshot_id, fetched)
+    
+    def _write_mapped_catalog(self, playlist_id, snapshot_id, track_uris, track_names, track_artists):
+        """Write the memory-mapped catalog of a track pool unless this version already has one"""
+        if not os.path.exists(catalog_path(playlist_id, snapshot_id)):
+            durations_ms = [int(self.track_durations.get(uri, 0) * 1000) for uri in track_uris]
+            save_catalog(playlist_id, snapshot_id, track_uris, track_names, track_artists, durations_ms)
+    
+    def map_library_tracks(self, track_uris, track_names, track_artists):
+        """
+        Return a library-wide track pool of at least MAPPED_CATALOG_MIN_TRACKS
+        tracks as a MappedCatalog (written on first use), or None for smaller pools
+        """
+        if len(track_uris) < MAPPED_CATALOG_MIN_TRACKS:
+            return None
+        snapshot_id = content_snapshot(track_uris, track_names, track_artists)
+        self._write_mapped_catalog(LIBRARY_ID, snapshot_id, track_uris, track_names, track_artists)
+        return open_catalog(LIBRARY_ID, snapshot_id)
+    
+    def _liked_songs_snapshot(self, count, newest_added_at, reconciled_at):
+        """Return the version a mapped Liked Songs catalog is written under"""
+        return f"{reconciled_at!r}:{count}:{newest_added_at}"
+    
+    def _map_liked_songs(self, track_uris, track_names, track_artists, rows, reconciled_at):
+        """Write the mapped catalog of a large Liked Songs library as it is now cached"""
+        if len(rows) >= MAPPED_CATALOG_MIN_TRACKS:
+            snapshot_id = self._liked_songs_snapshot(len(rows), rows[0][6], reconciled_at)
+            self._write_mapped_catalog(LIKED_SONGS_ID, snapshot_id, track_uris, track_names, track_artists)
+    
+    def open_mapped_liked_songs(self):
+        """
+        Return the liked songs as a MappedCatalog if a large library is cached
+        and one request shows nothing was liked or unliked since, else None
+        """
+        state = self.catalog_cache.get_liked_songs_state()
+        if state is None:
+            return None
+        count, newest_added_at, reconciled_at = state
+        if count < MAPPED_CATALOG_MIN_TRACKS or not reconciled_at:
+            return None
+        if time.time() - reconciled_at >= LIKED_SONGS_RECONCILE_HOURS * 3600:
+            return None
         
+        response = self.sp.current_user_saved_tracks(limit=1)
+        items = response.get('items') or []
+        if response.get('total') != count or not items or items[0].get('added_at') != newest_added_at:
+            return None
+        return open_catalog(LIKED_SONGS_ID, self._liked_songs_snapshot(count, newest_added_at, reconciled_at))
+    
+    def mapped_catalog_of(self, track_uris):
+        """Return the MappedCatalog track_uris belongs to if it is the one last loaded, else None"""
+        if self.mapped_catalog is not None and self.mapped_catalog.track_uris is track_uris:
+            return self.mapped_catalog
+        return None
+    
+    def load_playlist_catalog(self, playlist_id, min_tracks=1):
+        """Return a TrackCatalog of a playlist that keeps loading in the background after min_tracks"""
+        snapshot_id = self.sp.playlist(playlist_id, fields="snapshot_id").get('snapshot_id')
+        catalog = TrackCatalog(playlist_id, snapshot_id)
+        return catalog.load(self.iter_playlist_track_pages(playlist_id, snapshot_id), min_tracks)
+    
+    def load_liked_songs_catalog(self, min_tracks=1):
+        """Return a TrackCatalog of the liked songs that keeps loading in the background after min_tracks"""
+        mapped = self.open_mapped_liked_songs()
+        if mapped is not None:
+            self.mapped_catalog = mapped
+            return TrackCatalog().load_mapped(mapped)
+        return TrackCatalog().load(self.iter_liked_song_pages(), min_tracks)
+    
+    def _collect_track_info(self, pages):
+        """Concatenate the per-page (track_uris, track_names, track_artists) lists"""
+        track_uris = []
+        track_names = []
+        track_artists = []
+        
+        # Each raw page is dropped as soon as its tracks are extracted
+        for uris, names, artists in pages:
+            track_uris.extend(uris)
+            track_names.extend(names)
+            track_artists.extend(artists)
+        
+        return track_uris, track_names, track_artists
+    
+    def _get_playlist_tracks_by_id(self, playlist_id):
+        """Get tracks from a playlist by ID"""
         try:
-            while True:
-                response = self.sp.playlist_items(playlist_id, limit=limit, offset=offset)
-                tracks.extend(response['items'])
-                if len(response['items']) < limit:
-                    break
-                offset += limit
-            
-            return self._extract_track_info(tracks)
+            # Read the snapshot first so the tracks are never older than it
+            snapshot_id = self.sp.playlist(playlist_id, fields="snapshot_id").get('snapshot_id')
+            track_uris, track_names, track_artists = self._collect_track_info(
+                self.iter_playlist_track_pages(playlist_id, snapshot_id)
+            )
+            if snapshot_id:
+                self.loaded_snapshot = (playlist_id, snapshot_id, track_uris)
+            return track_uris, track_names, track_artists
         except Exception as e:
             print(f"Error getting playlist tracks: {e}")
             return [], [], []
     
-    def _extract_track_info(self, tracks):
-        """Extract track URIs, names, and artists from track objects"""
+    def _track_info_from_rows(self, rows):
+        """Extract track URIs, cleaned names, and first artists from catalog cache rows"""
         track_uris = []
         track_names = []
         track_artists = []
         
-        for item in tracks:
-            if item['track'] is not None:
-                track_uris.append(item['track']['uri'])
-                track_names.append(self._clean_title(item['track']['name']))
-                track_artists.append(item['track']['artists'][0]['name'])
+        for uri, name, artist, _, _, duration_ms, _ in rows:
+            name = self._clean_title(name)
+            track_uris.append(uri)
+            track_names.append(name)
+            track_artists.append(artist)
+            if duration_ms:
+                self.track_durations[uri] = duration_ms / 1000
         
         return track_uris, track_names, track_artists
     
@@ -210,128 +736,52 @@ class GameLogic:
         """Return the current track information"""
         return self.current_track, self.current_track_name, self.current_track_artist, self.game_settings
     
+    def _current_track_features(self):
+        """Return the comparison keys of the current track, computed once per track"""
+        full_name = f"{self.current_track_name} by {self.current_track_artist}"
+        if self.current_features is None or self.current_features[0] != full_name:
+            self.current_features = (full_name, TrackFeatures(full_name, self.current_track_name))
+        return self.current_features[1]
+    
     def check_guess(self, guess):
         """Check if a guess is correct based on the game mode"""
         if not self.current_track_name or not self.current_track_artist:
             print(f"Error: Missing track information in GameLogic. Name: {self.current_track_name}, Artist: {self.current_track_artist}")
             return False
             
-        correct_title = self.current_track_name.lower()
-        correct_full = f"{self.current_track_name} by {self.current_track_artist}".lower()
-        guess_lower = guess.lower()
+        features = self._current_track_features()
+        correct_title = features.title
+        correct_full = features.full
+        guess_key = normalize_key(guess)
+        # A punctuation-only title ("?", "...") keys as itself and must be typed exactly
+        fuzzy_title = any(char.isalnum() for char in correct_title)
         
         # Debug information
-        print(f"Checking guess: '{guess_lower}' against '{correct_title}' or '{correct_full}' in mode: {self.game_settings[0]}")
+        print(f"Checking guess: '{guess_key}' against '{correct_title}' or '{correct_full}' in mode: {self.game_settings[0]}")
         
         if self.game_settings[0] == "Expert":
             # Exact match on "title by artist"
-            return guess_lower == correct_full
+            return guess_key == correct_full
         elif self.game_settings[0] == "Harder":
             # Exact match on title only
-            return guess_lower == correct_title
+            return guess_key == correct_title
         elif self.game_settings[0] == "Hard":
             # Close match with <= 1 error on title, or exact match on full
-            title_dist = levenshtein_distance(guess_lower, correct_title)
-            result = title_dist <= 1 or guess_lower == correct_full
+            title_dist = levenshtein_distance(guess_key, correct_title, max_distance=1)
+            result = title_dist <= (1 if fuzzy_title else 0) or guess_key == correct_full
             print(f"Hard mode: Title distance {title_dist}, Result: {result}")
             return result
         else:  # Normal mode
             # Allow <= 2 errors in either "title" or "title by artist"
-            dist_title = levenshtein_distance(guess_lower, correct_title)
-            dist_full = levenshtein_distance(guess_lower, correct_full)
-            result = dist_title <= 2 or dist_full <= 2
+            dist_title = levenshtein_distance(guess_key, correct_title, max_distance=2)
+            dist_full = levenshtein_distance(guess_key, correct_full, max_distance=2)
+            result = dist_title <= (2 if fuzzy_title else 0) or dist_full <= 2
             print(f"Normal mode: Title distance {dist_title}, Full distance {dist_full}, Result: {result}")
             return result
     
     def get_game_mode_rules(self, mode):
-        """Get a function that implements the filtering rules for a game mode"""
-        def normal_rule(query, item):
-            """Normal mode: Show partial matches with Levenshtein distance <= 2"""
-            item_lower = item.lower()
-            title = item_lower.split(" by ")[0]
-            
-            # More flexible matching for partial inputs:
-            # 1. Show if query is a substring of title or full item
-            # 2. OR if the query is close to the beginning of the title
-            # 3. OR if the full Levenshtein distance is acceptable
-            
-            # If query is a substring anywhere
-            if query in item_lower:
-                return True
-                
-            # Check if query is the beginning of a word in the title
-            title_words = title.split()
-            for word in title_words:
-                if word.startswith(query):
-                    return True
-            
-            # For shorter queries (1-3 chars), use scaled Levenshtein distance
-            if len(query) <= 3:
-                max_distance = len(query) - 1  # Allow fewer errors for shorter queries
-                return levenshtein_distance(query, title) <= max_distance
-            
-            # For medium queries (4-6 chars), allow prefix matching
-            if len(query) <= 6:
-                if title.startswith(query):
-                    return True
-                for word in title_words:
-                    if word.startswith(query):
-                        return True
-            
-            # For longer queries, use Levenshtein but with higher threshold
-            max_distance = min(2, len(query) // 3)  # Scale with query length
-            return levenshtein_distance(query, title) <= max_distance
-        
-        def hard_rule(query, item):
-            """Hard mode: Only show exact matches with <= 1 error in the title"""
-            item_lower = item.lower()
-            title = item_lower.split(" by ")[0]
-            
-            # More flexible than before but still restrictive:
-            # 1. Show if query is a substring of the beginning of title
-            # 2. OR if the query is close to the title with 1 error
-            
-            # Prefix matching
-            if title.startswith(query):
-                return True
-                
-            # Short queries - show more
-            if len(query) <= 3:
-                return query in title
-                
-            # Levenshtein matching with restrictions
-            return levenshtein_distance(query, title) <= 1 or query == item_lower
-        
-        def harder_rule(query, item):
-            """Harder mode: Only show if exact song name match"""
-            title = item.lower().split(" by ")[0]
-            
-            # Slightly more flexible:
-            # 1. Match beginning of title
-            # 2. Only exact match for longer queries
-            if len(query) <= 3:
-                return title.startswith(query)
-                
-            return query == title
-        
-        def expert_rule(query, item):
-            """Expert mode: Only show if exact 'title by artist' match"""
-            # Even in expert mode, show suggestions for short queries
-            if len(query) <= 2:
-                return item.lower().startswith(query)
-                
-            return query == item.lower()
-        
-        rules = {
-            "Normal": normal_rule,
-            "Hard": hard_rule,
-            "Harder": harder_rule,
-            "Expert": expert_rule,
-            # For backward compatibility
-            "HarderHarder": expert_rule
-        }
-        
-        return rules.get(mode, normal_rule)
+        """Get the compiled rule that implements the filtering rules for a game mode"""
+        return MODE_RULES.get(mode, MODE_RULES["Normal"])
     
     def set_game_mode(self, mode):
         """Set the game mode"""
@@ -0,0 +1,176 @@
+"""
+Mapped Catalog - Memory-mapped binary track catalogs for very large libraries
+"""
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Sequence
+from config import *
+
+HEADER = struct.Struct("<I")  # Number of strings in a string table
+CATALOG_MAGIC = b"SGGC"
+CATALOG_FORMAT_VERSION = 1  # Bump when the catalog file layout changes
+# Magic, format version, then the byte size of the uri, name, artist and duration sections
+CATALOG_HEADER = struct.Struct("<4sI4Q")
+LIBRARY_ID = "library"  # Playlist ID the library-wide track pool is written under
+
+
+def encode_strings(strings):
+    """Encode strings as a count, an offset table and one UTF-8 heap"""
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = array("I", [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    return HEADER.pack(len(encoded)) + offsets.tobytes() + b"".join(encoded)
+
+
+def decode_strings(buffer, start, end):
+    """Decode strings start..end-1 from a buffer written by encode_strings"""
+    count = HEADER.unpack_from(buffer, 0)[0]
+    table_start = HEADER.size
+    heap_start = table_start + (count + 1) * 4
+    offsets = array("I", bytes(buffer[table_start + start * 4:table_start + (end + 1) * 4]))
+    heap = bytes(buffer[heap_start + offsets[0]:heap_start + offsets[-1]])
+    base = offsets[0]
+    return [
+        heap[offsets[i] - base:offsets[i + 1] - base].decode("utf-8")
+        for i in range(end - start)
+    ]
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence over a buffer written by encode_strings. Entries are
+    decoded on access, so a memory-mapped table only pages in what is read.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        self._count = HEADER.unpack_from(self._buffer, 0)[0]
+        self._heap_start = HEADER.size + (self._count + 1) * 4
+        self._offsets = self._buffer[HEADER.size:self._heap_start].cast("I")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return decode_strings(self._buffer, start, stop) if start < stop else []
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("string table index out of range")
+        start = self._heap_start + self._offsets[index]
+        end = self._heap_start + self._offsets[index + 1]
+        return str(self._buffer[start:end], "utf-8")
+
+    def __iter__(self):
+        heap = self._buffer[self._heap_start:]
+        offsets = self._offsets
+        for i in range(self._count):
+            yield str(heap[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+class MappedCatalog:
+    """
+    The uri/name/artist sequences and durations of a catalog file, read
+    through a memory map. Opening one costs a header read no matter how
+    many tracks it holds; strings are decoded only when accessed.
+    """
+
+    def __init__(self, path):
+        """Map a file written by write_catalog; raises ValueError for other files"""
+        self.path = path
+        with open(path, "rb") as catalog_file:
+            self._map = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *sizes = CATALOG_HEADER.unpack_from(self._map, 0)
+        if magic != CATALOG_MAGIC or version != CATALOG_FORMAT_VERSION:
+            raise ValueError(f"not a catalog file of format {CATALOG_FORMAT_VERSION}")
+
+        sections = []
+        offset = CATALOG_HEADER.size
+        view = memoryview(self._map)
+        for size in sizes:
+            sections.append(view[offset:offset + size])
+            offset += size
+        self.track_uris, self.track_names, self.track_artists = (StringTable(section) for section in sections[:3])
+        self._durations = sections[3].cast("I")  # Milliseconds, 0 where unknown
+
+    def __len__(self):
+        return len(self.track_uris)
+
+    def duration(self, index):
+        """Return the duration of track index in seconds, or None if unknown"""
+        duration_ms = self._durations[index]
+        return duration_ms / 1000 if duration_ms else None
+
+
+def catalog_path(playlist_id, snapshot_id):
+    """Return the file a playlist snapshot's mapped catalog is written to"""
+    snapshot = hashlib.sha1(snapshot_id.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "catalogs", f"{playlist_id}-{snapshot}.cat")
+
+
+def content_snapshot(*columns):
+    """Return a version string identifying the contents of some track lists"""
+    digest = hashlib.sha1()
+    for column in columns:
+        for string in column:
+            digest.update(string.encode("utf-8"))
+            digest.update(b"\n")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def write_catalog(path, track_uris, track_names, track_artists, durations_ms):
+    """Write the track lists to a catalog file (atomically, via a temporary file)"""
+    sections = [
+        encode_strings(track_uris),
+        encode_strings(track_names),
+        encode_strings(track_artists),
+        array("I", (int(duration_ms or 0) for duration_ms in durations_ms)).tobytes(),
+    ]
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as catalog_file:
+        catalog_file.write(CATALOG_HEADER.pack(
+            CATALOG_MAGIC, CATALOG_FORMAT_VERSION, *(len(section) for section in sections)
+        ))
+        for section in sections:
+            catalog_file.write(section)
+    os.replace(temp_path, path)
+
+
+def open_catalog(playlist_id, snapshot_id):
+    """Return the MappedCatalog of a playlist snapshot, or None if none was written"""
+    path = catalog_path(playlist_id, snapshot_id)
+    try:
+        return MappedCatalog(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error opening catalog {path}: {e}")
+        return None
+
+
+def save_catalog(playlist_id, snapshot_id, track_uris, track_names, track_artists, durations_ms):
+    """Write a playlist snapshot's catalog file, then remove the files of older snapshots"""
+    path = catalog_path(playlist_id, snapshot_id)
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        write_catalog(path, track_uris, track_names, track_artists, durations_ms)
+        for name in os.listdir(directory):
+            if name.startswith(f"{playlist_id}-") and os.path.join(directory, name) != path:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # Still mapped by a running game on some platforms
+    except Exception as e:
+        print(f"Error saving catalog {path}: {e}")
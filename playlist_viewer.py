@@ -7,11 +7,14 @@ import sys
 import io
 import threading
 import urllib.request
+from functools import partial
 from PIL import Image, ImageTk
 import customtkinter as ctk
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from config import *
+from catalog_cache import CatalogCache, track_rows
+from spotify_manager import PLAYLIST_INFO_FIELDS, PLAYLIST_TRACK_FIELDS, iter_pages
 from setup import load_spotify_credentials, setup_spotify_credentials
 
 class PlaylistViewer(ctk.CTk):
@@ -30,6 +33,7 @@ class PlaylistViewer(ctk.CTk):
         
         # Initialize Spotify API
         self.setup_spotify_api()
+        self.catalog_cache = CatalogCache()  # Shared with the game
         
         # Create UI
         self.create_widgets()
@@ -257,7 +261,7 @@ class PlaylistViewer(ctk.CTk):
         """Load playlist in a background thread"""
         try:
             # Get playlist info
-            playlist_info = self.sp.playlist(playlist_id)
+            playlist_info = self.sp.playlist(playlist_id, fields=PLAYLIST_INFO_FIELDS)
             
             # Get playlist details
             playlist_name = playlist_info['name']
@@ -278,35 +282,28 @@ class PlaylistViewer(ctk.CTk):
             self.after(0, lambda: self.playlist_owner_label.configure(text=f"By: {playlist_owner}"))
             self.after(0, lambda: self.track_count_label.configure(text=f"Tracks: {total_tracks}"))
             
-            # Get all tracks
-            tracks = []
-            offset = 0
-            limit = 100
-            
-            while True:
-                self.after(0, lambda o=offset, t=total_tracks: self.set_status(f"Loading tracks... {min(o, t)}/{t}"))
-                response = self.sp.playlist_items(
-                    playlist_id, 
-                    limit=limit, 
-                    offset=offset,
-                    fields="items(track(name,artists,album(name))),next"
+            # Unchanged playlists come from the catalog cache shared with the game
+            snapshot_id = playlist_info.get('snapshot_id')
+            rows = self.catalog_cache.get(playlist_id, snapshot_id) if snapshot_id else None
+            if rows is None:
+                # Get all tracks (pages after the first are fetched concurrently)
+                pages = iter_pages(
+                    partial(self.sp.playlist_items, playlist_id, fields=PLAYLIST_TRACK_FIELDS),
+                    100,
+                    progress=lambda loaded, total: self.after(
+                        0, lambda: self.set_status(f"Loading tracks... {loaded}/{total or total_tracks}")
+                    )
                 )
-                
-                # Add track items
-                for item in response['items']:
-                    track = item['track']
-                    if track:  # Skip None tracks
-                        tracks.append({
-                            'name': track['name'],
-                            'artists': ", ".join([artist['name'] for artist in track['artists']]),
-                            'album': track['album']['name']
-                        })
-                
-                # Check if we need to get more tracks
-                if len(tracks) >= total_tracks or not response.get('next'):
-                    break
-                    
-                offset += limit
+                rows = []
+                for items in pages:
+                    rows.extend(track_rows(items))
+                if snapshot_id:
+                    self.catalog_cache.put(playlist_id, snapshot_id, rows)
+            
+            tracks = [
+                {'name': name, 'artists': artists, 'album': album}
+                for _, name, _, artists, album, _, _ in rows
+            ]
             
             # Display tracks
             self.after(0, lambda: self._display_tracks(tracks))
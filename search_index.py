@@ -0,0 +1,639 @@
+"""
+Search Index - Indexes over the track catalog used for guess suggestions
+"""
+import hashlib
+import heapq
+import os
+import pickle
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import chain
+from os.path import commonprefix
+from config import *
+from game_logic import (
+    TrackFeatures, extract_within, get_distance_backend, key_prefix_length, levenshtein_distance,
+    normalize_key, phonetic_key
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the BK-tree handles every query without it
+    np = None
+
+TRIGRAM_SIZE = 3
+PREFIX_SENTINEL = "\U0010ffff"  # Sorts after every character we index
+VECTORIZED_MIN_DISTANCE = 2  # Smallest edit bound sent to the NumPy path
+PHONETIC_MIN_LENGTH = 4  # Shorter queries sound like too many titles
+INDEX_FORMAT_VERSION = 5  # Bump when the pickled SuggestionIndex layout changes
+
+
+def catalog_fingerprint(full_names):
+    """Return a hash identifying a list of "title by artist" strings (duplicates ignored)"""
+    items = dict.fromkeys(full_names)
+    return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()
+
+
+def shared_completion(completions):
+    """
+    Return the completion shared by several indexes' completions, or None
+    without any. The common prefix is taken of their keys, so differences in
+    case or punctuation don't cancel it, then cut from the first completion.
+    """
+    completions = [completion for completion in completions if completion is not None]
+    if not completions:
+        return None
+    key = commonprefix([normalize_key(completion) for completion in completions])
+    display = completions[0]
+    return display[:key_prefix_length(display, key)]
+
+
+def _trigrams(text):
+    """Return the set of distinct trigrams in a string"""
+    return {text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the ids of the strings containing them"""
+
+    def __init__(self, texts=()):
+        """Build the postings for the given (already normalized) strings"""
+        self.postings = {}
+        self.size = 0
+        for text in texts:
+            self.add(text)
+
+    def add(self, text):
+        """Add a string to the index and return its id"""
+        item_id = self.size
+        for gram in _trigrams(text):
+            self.postings.setdefault(gram, []).append(item_id)
+        self.size += 1
+        return item_id
+
+    def contains(self, query):
+        """
+        Return the ids of strings that may contain query as a substring.
+        The result is a superset of the real matches; queries shorter than
+        a trigram cannot be narrowed and return every id.
+        """
+        if len(query) < TRIGRAM_SIZE:
+            return set(range(self.size))
+
+        lists = sorted(
+            (self.postings.get(gram, ()) for gram in _trigrams(query)),
+            key=len
+        )
+        result = set(lists[0])
+        for ids in lists[1:]:
+            if not result:
+                break
+            result.intersection_update(ids)
+        return result
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over strings using Levenshtein distance.
+    Answers "everything within k edits of this query" while skipping whole
+    subtrees that the triangle inequality rules out.
+    """
+
+    def __init__(self, words=()):
+        """Build the tree from an iterable of (word, value) pairs"""
+        self.root = None
+        self.size = 0
+        for word, value in words:
+            self.add(word, value)
+
+    def add(self, word, value):
+        """Add a word with an associated value (equal words share one node)"""
+        self.size += 1
+        if self.root is None:
+            self.root = (word, [value], {})
+            return
+
+        node = self.root
+        while True:
+            node_word, values, children = node
+            distance = levenshtein_distance(word, node_word)
+            if distance == 0:
+                values.append(value)
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (word, [value], {})
+                return
+            node = child
+
+    def search(self, query, max_distance):
+        """Return (distance, word, values) for every word within max_distance of query"""
+        results = []
+        if self.root is None:
+            return results
+
+        stack = [self.root]
+        while stack:
+            node_word, values, children = stack.pop()
+            distance = levenshtein_distance(query, node_word)
+            if distance <= max_distance:
+                results.append((distance, node_word, values))
+            low = distance - max_distance
+            high = distance + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return results
+
+
+class PrefixIndex:
+    """Sorted array of strings answering prefix range queries with bisect"""
+
+    def __init__(self, keys=()):
+        """Build the index from an iterable of (key, value) pairs"""
+        self.keys = []
+        self.values = []
+        self._pending = []  # Added pairs not merged into the arrays yet
+        self.add(keys)
+
+    def add(self, keys):
+        """Queue more (key, value) pairs; they are merged in on the next lookup"""
+        self._pending.extend(keys)
+
+    def _merge(self):
+        """Merge the queued pairs into the sorted arrays"""
+        if self._pending:
+            # Both inputs are sorted runs, which sorted() merges in linear time
+            pairs = sorted(chain(zip(self.keys, self.values), sorted(self._pending)))
+            self.keys = [key for key, _ in pairs]
+            self.values = [value for _, value in pairs]
+            self._pending = []
+
+    def span(self, prefix, start=0, end=None):
+        """
+        Return the (start, end) slice of keys that start with prefix.
+        Passing the span of a shorter prefix limits the search to that slice.
+        """
+        self._merge()
+        if end is None:
+            end = len(self.keys)
+        start = bisect_left(self.keys, prefix, start, end)
+        end = bisect_left(self.keys, prefix + PREFIX_SENTINEL, start, end)
+        return start, end
+
+    def complete(self, prefix):
+        """Return the longest common prefix of all keys that start with prefix, or None"""
+        start, end = self.span(prefix)
+        if start == end:
+            return None
+        # In a sorted range the first and last keys differ the earliest
+        return commonprefix([self.keys[start], self.keys[end - 1]])
+
+
+class TitleMatrix:
+    """
+    Titles encoded once into a padded uint32 code-point matrix so one query
+    can be compared against the whole catalog with NumPy (requires NumPy).
+    """
+
+    def __init__(self, titles=()):
+        """Encode the given titles, one row per title"""
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, 0), dtype=np.uint32)
+        self.add(titles)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, titles):
+        """Append one row per title, widening the matrix if a title is longer than the rest"""
+        lengths = np.array([len(title) for title in titles], dtype=np.int32)
+        width = max(self.codes.shape[1], int(lengths.max()) if len(titles) else 0)
+        codes = np.zeros((len(titles), width), dtype=np.uint32)
+        for row, title in enumerate(titles):
+            if title:
+                codes[row, :len(title)] = np.frombuffer(title.encode("utf-32-le"), dtype=np.uint32)
+        if width > self.codes.shape[1]:
+            self.codes = np.pad(self.codes, ((0, 0), (0, width - self.codes.shape[1])))
+        self.codes = np.concatenate([self.codes, codes])
+        self.lengths = np.concatenate([self.lengths, lengths])
+
+    def within(self, query, max_distance):
+        """Return the row numbers whose title is within max_distance edits of query"""
+        m = len(query)
+        rows = np.nonzero(np.abs(self.lengths - m) <= max_distance)[0]
+        if rows.size == 0:
+            return rows
+
+        # Titles longer than m + max_distance were filtered out above
+        width = min(self.codes.shape[1], m + max_distance)
+        codes = self.codes[rows, :width]
+        lengths = self.lengths[rows]
+        columns = np.arange(width + 1, dtype=np.int32)
+
+        # One DP row per query character, computed for every title at once
+        previous = np.tile(columns, (rows.size, 1))
+        for i, code in enumerate(np.frombuffer(query.encode("utf-32-le"), dtype=np.uint32), 1):
+            best = np.minimum(
+                previous[:, :-1] + (codes != code),  # substitution / match
+                previous[:, 1:] + 1                  # deletion
+            )
+            # Insertions chain left to right: current[j] = min(best[t] + j - t)
+            shifted = np.empty_like(previous)
+            shifted[:, 0] = i
+            shifted[:, 1:] = best - columns[1:]
+            current = np.minimum.accumulate(shifted, axis=1) + columns
+
+            # Rows whose whole DP row is over the bound can never come back
+            alive = current.min(axis=1) <= max_distance
+            if not alive.all():
+                rows, codes, lengths, current = rows[alive], codes[alive], lengths[alive], current[alive]
+                if rows.size == 0:
+                    return rows
+            previous = current
+
+        distances = previous[np.arange(rows.size), lengths]
+        return rows[distances <= max_distance]
+
+
+class SuggestionIndex:
+    """
+    Candidate lookup over the "title by artist" suggestion strings.
+    Built once per playlist; the game mode rules are only run on the
+    candidates it returns instead of on the whole catalog.
+    """
+
+    def __init__(self, full_names=()):
+        """Index the given "title by artist" strings (duplicates are dropped)"""
+        self.items = []
+        self.features = []
+        self.titles = []
+        self.trigrams = TrigramIndex()
+        self.title_tree = BKTree()
+        self.title_prefixes = PrefixIndex()
+        self.full_prefixes = PrefixIndex()
+        self.phonetic_ids = {}  # Phonetic key -> ids of the titles that sound like it
+        self.title_matrix = None  # Built on the first vectorized search, then kept up to date
+        self._fingerprint = None  # Computed on first use after a change
+        self._seen = set()
+
+        # Previous query and result per lookup, reused while the user keeps typing.
+        # Lookups run on suggestion worker threads, so they share one lock.
+        self._lock = threading.Lock()
+        self._last_substring = (None, None)
+        self._last_spans = {}
+
+        self.extend(full_names)
+
+    def extend(self, full_names):
+        """Add more "title by artist" strings, e.g. as later playlist pages arrive"""
+        with self._lock:
+            added = []
+            for name in full_names:
+                if name not in self._seen:
+                    self._seen.add(name)
+                    added.append((name, TrackFeatures(name)))
+
+            first_id = len(self.items)
+            for name, track in added:
+                item_id = self.trigrams.add(track.full)
+                self.items.append(name)
+                self.features.append(track)
+                self.titles.append(track.title)
+                self.title_tree.add(track.title, item_id)
+                if PHONETIC_SUGGESTIONS:
+                    self.phonetic_ids.setdefault(phonetic_key(track.title), []).append(item_id)
+
+            self.title_prefixes.add((track.title, item_id) for item_id, (_, track) in enumerate(added, first_id))
+            self.full_prefixes.add((track.full, item_id) for item_id, (_, track) in enumerate(added, first_id))
+            if added:
+                self._fingerprint = None
+
+            # New entries can match the remembered queries too
+            self._last_substring = (None, None)
+            self._last_spans = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def fingerprint(self):
+        """Hash identifying the catalog contents, e.g. in suggestion cache keys"""
+        with self._lock:
+            if self._fingerprint is None:
+                self._fingerprint = catalog_fingerprint(self.items)
+            return self._fingerprint
+
+    def __getstate__(self):
+        """Pickle the built structures but not the per-query state or the (cheap to rebuild) title matrix"""
+        state = self.__dict__.copy()
+        for name in ("_lock", "_last_substring", "_last_spans", "title_matrix"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.title_matrix = None
+        self._lock = threading.Lock()
+        self._last_substring = (None, None)
+        self._last_spans = {}
+
+    @staticmethod
+    def _file_header():
+        """Return the header that a saved index must match to be loaded"""
+        # The phonetic dict is only built when enabled
+        return (INDEX_FORMAT_VERSION, PHONETIC_SUGGESTIONS)
+
+    def save(self, path):
+        """Write the index to path (atomically, via a temporary file)"""
+        temp_path = f"{path}.tmp"
+        # Held so a completion on another thread can't merge the prefixes mid-dump
+        with self._lock:
+            self.title_prefixes._merge()
+            self.full_prefixes._merge()
+            if self._fingerprint is None:
+                self._fingerprint = catalog_fingerprint(self.items)
+            with open(temp_path, "wb") as index_file:
+                pickle.dump(self._file_header(), index_file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(self, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        """Return the index saved at path, or None if it is missing, outdated or for another catalog"""
+        try:
+            with open(path, "rb") as index_file:
+                if pickle.load(index_file) != cls._file_header():
+                    return None
+                index = pickle.load(index_file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading suggestion index {path}: {e}")
+            return None
+
+        if not isinstance(index, cls) or (fingerprint is not None and index.fingerprint != fingerprint):
+            return None
+        return index
+
+    def substring_matches(self, query):
+        """Return the ids whose full name contains query"""
+        last_query, last_ids = self._last_substring
+        if last_query and query.startswith(last_query):
+            # Extending the query can only drop matches
+            pool = last_ids
+        else:
+            pool = self.trigrams.contains(query)
+
+        ids = {item_id for item_id in pool if query in self.features[item_id].full}
+        self._last_substring = (query, ids)
+        return ids
+
+    def prefix_matches(self, prefixes, query):
+        """Return the ids of keys in a PrefixIndex that start with query"""
+        last_query, last_span = self._last_spans.get(prefixes, (None, None))
+        if last_query is not None and query.startswith(last_query):
+            span = prefixes.span(query, *last_span)
+        else:
+            span = prefixes.span(query)
+
+        self._last_spans[prefixes] = (query, span)
+        return set(prefixes.values[span[0]:span[1]])
+
+    def near(self, query, max_distance):
+        """Return ids whose title is within max_distance edits of query"""
+        # rapidfuzz scans the whole title list in native code, faster than either path below
+        if get_distance_backend() == "rapidfuzz":
+            return set(extract_within(query, self.titles, max_distance))
+
+        # Wide searches visit most of the BK-tree; scan the matrix in one go instead
+        if np is not None and max_distance >= VECTORIZED_MIN_DISTANCE:
+            if self.title_matrix is None:
+                self.title_matrix = TitleMatrix()
+            if len(self.title_matrix) < len(self.titles):
+                self.title_matrix.add(self.titles[len(self.title_matrix):])
+            return set(self.title_matrix.within(query, max_distance).tolist())
+
+        ids = set()
+        for _, _, item_ids in self.title_tree.search(query, max_distance):
+            ids.update(item_ids)
+        return ids
+
+    def sound_alikes(self, query):
+        """Return the ids whose title sounds like query"""
+        if len(query) < PHONETIC_MIN_LENGTH:
+            return set()
+        return set(self.phonetic_ids.get(phonetic_key(query), ()))
+
+    def _prefix_index(self, rule):
+        """Return the PrefixIndex covering a prefix-only rule, or None"""
+        if rule.prefix_scope == "title":
+            return self.title_prefixes
+        if rule.prefix_scope == "full":
+            return self.full_prefixes
+        return None
+
+    def candidates(self, rule, query):
+        """Return a superset of the ids the mode rule can accept for query"""
+        # Harder and Expert only ever accept prefixes of the title or full name
+        prefixes = self._prefix_index(rule)
+        if prefixes is not None:
+            return self.prefix_matches(prefixes, query)
+
+        ids = self.substring_matches(query)
+        max_distance = rule.max_title_distance(query)
+        if max_distance is not None and max_distance >= 0:
+            ids |= self.near(query, max_distance)
+        return ids
+
+    def complete(self, rule, query):
+        """
+        Return the longest unambiguous completion of query for the strict
+        modes (the query itself for other modes), or None without matches.
+        The completion is cut from the original "title by artist" string of
+        a match, so it keeps the catalog's capitalization and punctuation.
+        """
+        prefixes = self._prefix_index(rule)
+        if prefixes is None:
+            return query
+        with self._lock:
+            completion = prefixes.complete(query)
+            if completion is None:
+                return None
+            display = self.items[prefixes.values[prefixes.span(completion)[0]]]
+        return display[:key_prefix_length(display, completion)]
+
+    def score(self, query, item_id):
+        """Return how relevant an item is to query (higher is better)"""
+        track = self.features[item_id]
+        full = track.full
+        title = track.title
+
+        if query == title or query == full:
+            return 100
+        if full.startswith(query):
+            return 80
+        if f" {query}" in full:
+            return 60  # Starts a word
+        if query in full:
+            return 40
+
+        # Typo matches: closer is better, then sound-alikes, anything else ranks last
+        distance = levenshtein_distance(query, title, max_distance=2)
+        if distance <= 2:
+            return 20 - 5 * distance
+        if self.phonetic_ids and phonetic_key(query) == phonetic_key(title):
+            return 5
+        return 0
+
+    def _rank_key(self, query, item_id):
+        """Sort key putting the best matches first (ties: shorter, then alphabetical)"""
+        return (-self.score(query, item_id), len(self.features[item_id].full), self.items[item_id])
+
+    def ranked(self, rule, query, limit=None):
+        """
+        Return the sort keys of the entries accepted by a compiled mode rule,
+        best first; each key ends with the suggestion string. With a limit
+        only the top entries are selected (using a bounded heap) instead of
+        sorting every match.
+        """
+        with self._lock:
+            candidates = self.candidates(rule, query)
+        features = self.features
+        accepted = {
+            item_id
+            for item_id in candidates
+            if rule.matches(query, features[item_id])
+        }
+        if rule.phonetic:
+            accepted |= self.sound_alikes(query)
+
+        keys = [self._rank_key(query, item_id) for item_id in accepted]
+        if limit is None:
+            return sorted(keys)
+        return heapq.nsmallest(limit, keys)
+
+    def match(self, rule, query, limit=None):
+        """Return the suggestion strings accepted by a compiled mode rule, best first"""
+        return [key[-1] for key in self.ranked(rule, query, limit)]
+
+
+class MergedIndex:
+    """
+    Suggestion lookup over several indexes at once (e.g. the current
+    playlist plus the library-wide decoy index), with the same match/complete
+    interface as SuggestionIndex. Entries found in more than one index are
+    suggested once. The merged indexes stay owned by the caller.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = list(indexes)
+
+    @property
+    def fingerprint(self):
+        """Combined fingerprint (recomputed, since merged indexes can still grow)"""
+        return hashlib.sha1(
+            "\n".join(index.fingerprint for index in self.indexes).encode("utf-8")
+        ).hexdigest()
+
+    def __len__(self):
+        return sum(len(index) for index in self.indexes)
+
+    def ranked(self, rule, query, limit=None):
+        """Return the sort keys of the best distinct matches across all indexes"""
+        keys = []
+        seen = set()
+        for key in heapq.merge(*(index.ranked(rule, query, limit) for index in self.indexes)):
+            if key[-1] in seen:
+                continue
+            seen.add(key[-1])
+            keys.append(key)
+            if len(keys) == limit:
+                break
+        return keys
+
+    def match(self, rule, query, limit=None):
+        """Return the suggestion strings accepted by a compiled mode rule, best first"""
+        return [key[-1] for key in self.ranked(rule, query, limit)]
+
+    def complete(self, rule, query):
+        """Return the completion of query shared by every index's matches, or None"""
+        return shared_completion(index.complete(rule, query) for index in self.indexes)
+
+
+def index_path(playlist_id, snapshot_id):
+    """Return the file a playlist's index is saved to for one snapshot"""
+    snapshot = hashlib.sha1(snapshot_id.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "indexes", f"{playlist_id}-{snapshot}.idx")
+
+
+def load_or_build_index(full_names, playlist_id=None, snapshot_id=None):
+    """
+    Return a SuggestionIndex for full_names, loaded from disk when this
+    playlist snapshot was indexed before. Newly built indexes of large
+    playlists are saved for the next game, replacing older snapshots.
+    """
+    full_names = list(full_names)
+    if not playlist_id or not snapshot_id or len(full_names) < INDEX_CACHE_MIN_TRACKS:
+        return SuggestionIndex(full_names)
+
+    path = index_path(playlist_id, snapshot_id)
+    index = SuggestionIndex.load(path, catalog_fingerprint(full_names))
+    if index is not None:
+        return index
+
+    index = SuggestionIndex(full_names)
+    save_index(index, playlist_id, snapshot_id)
+    return index
+
+
+def save_index(index, playlist_id, snapshot_id):
+    """Save a playlist snapshot's index, replacing the files of older snapshots"""
+    path = index_path(playlist_id, snapshot_id)
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith(f"{playlist_id}-"):
+                os.remove(os.path.join(directory, name))
+        index.save(path)
+    except Exception as e:
+        print(f"Error saving suggestion index {path}: {e}")
+
+
+class SuggestionCache:
+    """Bounded LRU cache of suggestion results with hit/miss counters"""
+
+    def __init__(self, max_size=SUGGESTION_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key (marking it recently used), or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (the counters are kept)"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,135 @@
+"""
+Sharded Matching - Process-pool suggestion backend for very large catalogs
+"""
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from config import *
+from mapped_catalog import MappedCatalog, decode_strings, encode_strings
+from search_index import SuggestionIndex, catalog_fingerprint, shared_completion
+
+# Per worker process: (source, start, end) -> SuggestionIndex of that shard
+_shard_indexes = {}
+
+
+def _shard_items(source, start, end):
+    """Return the "title by artist" strings of one shard of a shared-memory or catalog-file source"""
+    kind, location = source
+    if kind == "catalog":
+        # Each worker maps the file itself and decodes only its own shard
+        catalog = MappedCatalog(location)
+        return [
+            f"{name} by {artist}"
+            for name, artist in zip(catalog.track_names[start:end], catalog.track_artists[start:end])
+        ]
+
+    # Workers share the parent's resource tracker, so attaching here
+    # doesn't take ownership of the block
+    memory = shared_memory.SharedMemory(name=location)
+    try:
+        return decode_strings(memory.buf, start, end)
+    finally:
+        memory.close()
+
+
+def _shard_index(source, start, end):
+    """Return this worker's index for a shard, building it on first use"""
+    key = (source, start, end)
+    index = _shard_indexes.get(key)
+    if index is None:
+        index = SuggestionIndex(_shard_items(source, start, end))
+        _shard_indexes[key] = index
+    return index
+
+
+def _load_shard(source, start, end):
+    """Build a shard's index ahead of the first query"""
+    return len(_shard_index(source, start, end))
+
+
+def _rank_shard(source, start, end, rule, query, limit):
+    """Return the ranked matches of one shard"""
+    return _shard_index(source, start, end).ranked(rule, query, limit)
+
+
+def _complete_shard(source, start, end, rule, query):
+    """Return the completion of query within one shard, or None"""
+    return _shard_index(source, start, end).complete(rule, query)
+
+
+class ShardedMatcher:
+    """
+    Suggestion backend with the same match/complete interface as
+    SuggestionIndex that splits the catalog across worker processes.
+    The catalog strings live in shared memory so each worker decodes its
+    shard once instead of receiving a pickled copy. Given a MappedCatalog,
+    the workers map its file instead and this process decodes none of it.
+    """
+
+    def __init__(self, full_names=(), processes=MATCHING_PROCESSES, catalog=None):
+        """Share the catalog with the workers and start one worker per shard"""
+        self._memory = None
+        if catalog is not None:
+            self._source = ("catalog", catalog.path)
+            self._size = len(catalog)
+            # The file name already identifies the catalog's contents
+            self.fingerprint = catalog_fingerprint([catalog.path])
+        else:
+            items = list(dict.fromkeys(full_names))
+            self._size = len(items)
+            self.fingerprint = catalog_fingerprint(items)
+
+            data = encode_strings(items)
+            self._memory = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+            self._memory.buf[:len(data)] = data
+            self._source = ("memory", self._memory.name)
+
+        # One single-process pool per shard pins every shard to one worker,
+        # so each shard is decoded and indexed exactly once
+        shard_size = -(-self._size // max(1, processes)) or 1
+        self._shards = [
+            (start, min(start + shard_size, self._size))
+            for start in range(0, self._size, shard_size)
+        ]
+        self._executors = [ProcessPoolExecutor(max_workers=1) for _ in self._shards]
+        for executor, (start, end) in zip(self._executors, self._shards):
+            executor.submit(_load_shard, self._source, start, end)
+
+    def __len__(self):
+        return self._size
+
+    def _run(self, func, *args):
+        """Run func on every shard and return the results in shard order"""
+        futures = [
+            executor.submit(func, self._source, start, end, *args)
+            for executor, (start, end) in zip(self._executors, self._shards)
+        ]
+        return [future.result() for future in futures]
+
+    def ranked(self, rule, query, limit=None):
+        """Return the sort keys of the best distinct matches across all shards"""
+        # A catalog file can repeat an entry in two shards; copies rank side by side
+        merged = heapq.merge(*self._run(_rank_shard, rule, query, limit))
+        keys = []
+        for key in merged:
+            if not keys or key != keys[-1]:
+                keys.append(key)
+                if len(keys) == limit:
+                    break
+        return keys
+
+    def match(self, rule, query, limit=None):
+        """Return the suggestion strings accepted by a compiled mode rule, best first"""
+        return [key[-1] for key in self.ranked(rule, query, limit)]
+
+    def complete(self, rule, query):
+        """Return the completion of query shared by every shard's matches, or None"""
+        return shared_completion(self._run(_complete_shard, rule, query))
+
+    def close(self):
+        """Stop the workers and release the shared memory"""
+        for executor in self._executors:
+            executor.shutdown(wait=False)
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
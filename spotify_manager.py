@@ -3,8 +3,63 @@ Spotify Manager - Handles Spotify API interactions
 """
 import time
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from config import *
 
+# Response projections ("fields") with only what the game reads
+PLAYLIST_INFO_FIELDS = "name,snapshot_id,owner(display_name),tracks(total),images(url)"
+PLAYLIST_TRACK_FIELDS = "items(track(uri,name,duration_ms,artists(name),album(name))),next,total"
+
+def iter_pages(fetch_page, limit, progress=None, max_workers=PAGE_FETCH_WORKERS):
+    """
+    Yield the item lists of an offset-paginated Spotify endpoint, page by page
+    and in order. fetch_page(limit=..., offset=...) must return a paging object.
+    The first page tells the total, then the remaining offsets are fetched
+    concurrently, at most max_workers pages ahead of the consumer so raw pages
+    don't pile up. progress(loaded, total) is called after each page.
+    """
+    response = fetch_page(limit=limit, offset=0)
+    total = response.get('total')
+    loaded = len(response['items'])
+    if progress:
+        progress(loaded, total)
+    
+    if total is None:
+        # Projections without "total": follow the pages one by one
+        while True:
+            has_next = response.get('next') and len(response['items']) == limit
+            yield response['items']
+            if not has_next:
+                return
+            response = fetch_page(limit=limit, offset=loaded)
+            loaded += len(response['items'])
+            if progress:
+                progress(loaded, None)
+    
+    yield response['items']
+    del response
+    
+    offsets = iter(range(limit, total, limit))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(
+            executor.submit(fetch_page, limit=limit, offset=offset)
+            for offset in islice(offsets, max_workers)
+        )
+        while pending:
+            items = pending.popleft().result()['items']
+            for offset in islice(offsets, 1):
+                pending.append(executor.submit(fetch_page, limit=limit, offset=offset))
+            loaded += len(items)
+            if progress:
+                progress(loaded, total)
+            yield items
+
+def fetch_all_pages(fetch_page, limit, progress=None, max_workers=PAGE_FETCH_WORKERS):
+    """Fetch every item of an offset-paginated Spotify endpoint (see iter_pages)"""
+    return [item for items in iter_pages(fetch_page, limit, progress, max_workers) for item in items]
+
 class SpotifyManager:
     """Class to manage Spotify API interactions and playback"""
     
@@ -180,6 +235,7 @@ class SpotifyManager:
     
     def get_track_duration(self, track_uri):
         """Get the duration of a track"""
+        # /tracks has no fields parameter; loaders record durations up front instead
         try:
             return self.sp.track(track_uri)['duration_ms']/1000
         except Exception as e:
@@ -0,0 +1,107 @@
+"""
+Track Catalog - Track lists that keep growing while a playlist loads
+"""
+import threading
+
+
+class TrackCatalog:
+    """
+    The uri/name/artist lists of one playlist or library. load() returns as
+    soon as the first page is in; the remaining pages are appended by a
+    background thread and announced to listeners, so a game can start after
+    a single round trip.
+
+    Names and artists are appended before uris, so any index below
+    len(track_uris) is valid in all three lists even while pages arrive.
+    """
+
+    def __init__(self, playlist_id=None, snapshot_id=None):
+        self.playlist_id = playlist_id
+        self.snapshot_id = snapshot_id
+        self.track_uris = []
+        self.track_names = []
+        self.track_artists = []
+        self.complete = False
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def __len__(self):
+        return len(self.track_uris)
+
+    def load(self, pages, min_tracks=1):
+        """
+        Consume (track_uris, track_names, track_artists) pages until at least
+        min_tracks tracks are in, then load the rest in a background thread.
+        Errors on the first pages are raised; later ones end the catalog early.
+        """
+        for page in pages:
+            self.extend(*page)
+            if len(self) >= min_tracks:
+                break
+        else:
+            self.finish()
+            return self
+
+        threading.Thread(target=self._load_rest, args=(pages,), daemon=True).start()
+        return self
+
+    def load_mapped(self, mapped):
+        """Serve the sequences of a MappedCatalog, which is complete from the start"""
+        with self._lock:
+            self.track_uris = mapped.track_uris
+            self.track_names = mapped.track_names
+            self.track_artists = mapped.track_artists
+        self.finish()
+        return self
+
+    def _load_rest(self, pages):
+        """Append the remaining pages (runs in a background thread)"""
+        try:
+            for page in pages:
+                self.extend(*page)
+        except Exception as e:
+            print(f"Error loading remaining tracks: {e}")
+        finally:
+            self.finish()
+
+    def extend(self, track_uris, track_names, track_artists):
+        """Append one page of tracks and pass it on to the listeners"""
+        # Listeners run outside the lock, so they can take their time (or
+        # wait on the UI thread) without blocking add/remove_listener there
+        with self._lock:
+            self.track_names.extend(track_names)
+            self.track_artists.extend(track_artists)
+            self.track_uris.extend(track_uris)
+            listeners = list(self._listeners)
+        for on_page, _ in listeners:
+            on_page(track_uris, track_names, track_artists)
+
+    def finish(self):
+        """Mark the catalog as fully loaded and tell the listeners"""
+        with self._lock:
+            self.complete = True
+            listeners = list(self._listeners)
+        for _, on_complete in listeners:
+            if on_complete:
+                on_complete()
+
+    def add_listener(self, on_page, on_complete=None):
+        """
+        Call on_page(track_uris, track_names, track_artists) for every page
+        appended from now on, and on_complete() once loading ends (right away
+        if it already has). Returns how many tracks were in before, i.e. the
+        tracks the listener won't be told about.
+        """
+        with self._lock:
+            complete = self.complete
+            if not complete:
+                self._listeners.append((on_page, on_complete))
+            count = len(self.track_uris)
+        if complete and on_complete:
+            on_complete()
+        return count
+
+    def remove_listener(self, on_page):
+        """Stop calling a listener added with add_listener (a call already under way still finishes)"""
+        with self._lock:
+            self._listeners = [listener for listener in self._listeners if listener[0] != on_page]
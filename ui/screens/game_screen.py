@@ -8,14 +8,21 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 import random
 import time
+import threading
 import customtkinter as ctk
 from config import *
-from game_logic import levenshtein_distance
+from game_logic import key_prefix_length, levenshtein_distance, normalize_key
+from search_index import (
+    MergedIndex, SuggestionCache, SuggestionIndex, catalog_fingerprint, index_path,
+    load_or_build_index, save_index
+)
+from sharded_matching import ShardedMatcher
 
 class GameScreen(ctk.CTkFrame):
     """Main game screen for the Spotify Guessing Game"""
     
-    def __init__(self, parent, game_logic, spotify_manager, track_uris, track_names, track_artists, game_settings):
+    def __init__(self, parent, game_logic, spotify_manager, track_uris, track_names, track_artists, game_settings,
+                 suggestion_cache=None, library_index=None, catalog=None):
         super().__init__(parent, corner_radius=10, fg_color="transparent")
         self.parent = parent
         self.parent.geometry("1000x700")
@@ -28,6 +35,7 @@ class GameScreen(ctk.CTkFrame):
         self.track_artists = track_artists
         self.game_settings = game_settings  # (guessdiff, perreveal, randomstart)
         self.current_track = None
+        self.current_index = None
         self.correct_answer = None
         self.current_artist = None
         self.replay_count = 0
@@ -40,8 +48,37 @@ class GameScreen(ctk.CTkFrame):
         self.start_random = self.game_settings[2]
         
         # Suggestion list state
+        self.catalog = catalog  # TrackCatalog the track lists come from, if any
+        self._closed = False  # Set on destroy, so catalog threads stop calling back into the UI
+        self.library_index = None
+        mapped = self.game_logic.mapped_catalog_of(self.track_uris)
+        if mapped is not None and len(mapped) >= SHARDED_MATCHING_MIN_TRACKS:
+            # Worker processes read the mapped file, so the tracks aren't decoded here
+            self.playlist_index = ShardedMatcher(catalog=mapped)
+        elif catalog is not None and not catalog.complete:
+            # The rest of the playlist is still loading; the index keeps up with it
+            self._follow_catalog(catalog)
+        else:
+            full_names = [f"{name} by {artist}" for name, artist in zip(self.track_names, self.track_artists)]
+            if len(full_names) >= SHARDED_MATCHING_MIN_TRACKS:
+                # Very large catalogs are matched in worker processes
+                self.playlist_index = ShardedMatcher(full_names)
+            else:
+                # Reuses the index saved for this playlist snapshot, if any
+                if catalog is not None:
+                    playlist_id, snapshot_id = catalog.playlist_id, catalog.snapshot_id
+                else:
+                    playlist_id, snapshot_id = self.game_logic.snapshot_of(self.track_uris)
+                self.playlist_index = load_or_build_index(full_names, playlist_id, snapshot_id)
+        self.suggestion_index = self.playlist_index
+        if library_index is not None:
+            self.set_library_index(library_index)
+        self.suggestion_cache = suggestion_cache if suggestion_cache is not None else SuggestionCache()
         self.suggestion_buttons = []
         self.current_suggestion_index = -1  # Currently selected suggestion
+        self._suggestion_query = ""
+        self._suggestion_generation = 0  # Bumped on every input change to drop stale results
+        self._suggestion_after_id = None
         
         # Create UI
         self.create_widgets()
@@ -60,6 +97,71 @@ class GameScreen(ctk.CTkFrame):
         # Start update loop
         self.update_loop()
     
+    def destroy(self):
+        """Release the suggestion backend along with the widgets"""
+        self._closed = True
+        if self.catalog is not None:
+            self.catalog.remove_listener(self._on_catalog_page)
+        if hasattr(self.playlist_index, 'close'):
+            self.playlist_index.close()
+        super().destroy()
+    
+    def set_library_index(self, library_index):
+        """Mix suggestions from the library-wide index into this playlist's suggestions"""
+        self.library_index = library_index
+        self.suggestion_index = MergedIndex([self.playlist_index, library_index])
+    
+    def _use_playlist_index(self, playlist_index):
+        """Switch suggestions over to a different index of this playlist"""
+        self.playlist_index = playlist_index
+        self.suggestion_index = playlist_index
+        if self.library_index is not None:
+            self.set_library_index(self.library_index)
+    
+    def _follow_catalog(self, catalog):
+        """Set up a playlist index that grows while the catalog loads its remaining pages"""
+        index = None
+        if catalog.playlist_id and catalog.snapshot_id:
+            # An index saved for this snapshot already covers the whole playlist
+            index = SuggestionIndex.load(index_path(catalog.playlist_id, catalog.snapshot_id))
+        self._index_from_file = index is not None
+        self.playlist_index = index if index is not None else SuggestionIndex()
+        
+        count = catalog.add_listener(self._on_catalog_page, self._on_catalog_complete)
+        self._on_catalog_page(catalog.track_uris[:count], catalog.track_names[:count], catalog.track_artists[:count])
+    
+    def _on_catalog_page(self, track_uris, track_names, track_artists):
+        """Add a newly loaded page to the suggestions (called on the loading thread)"""
+        if not self._index_from_file:
+            self.playlist_index.extend(f"{name} by {artist}" for name, artist in zip(track_names, track_artists))
+    
+    def _on_catalog_complete(self):
+        """Finish the playlist index in a thread of its own once every page is loaded"""
+        # A rebuild or save can take a while; neither the loader nor the UI thread waits for it
+        threading.Thread(target=self._finish_catalog_index, daemon=True).start()
+    
+    def _finish_catalog_index(self):
+        """Check or save the playlist index against the fully loaded catalog (runs in a background thread)"""
+        catalog = self.catalog
+        full_names = [f"{name} by {artist}" for name, artist in zip(catalog.track_names, catalog.track_artists)]
+        
+        if self._index_from_file:
+            if self.playlist_index.fingerprint == catalog_fingerprint(full_names):
+                return
+            # The saved index doesn't match what was loaded after all; replace it
+            self._index_from_file = False
+            index = SuggestionIndex(full_names)
+            if self._closed:
+                return
+            self.after(0, lambda: self._closed or self._use_playlist_index(index))
+        else:
+            # Also picks up tracks that arrived before this screen started listening
+            index = self.playlist_index
+            index.extend(full_names)
+        
+        if catalog.playlist_id and catalog.snapshot_id and len(full_names) >= INDEX_CACHE_MIN_TRACKS:
+            save_index(index, catalog.playlist_id, catalog.snapshot_id)
+    
     def create_widgets(self):
         """Create the UI elements"""
         # Header frame
@@ -125,6 +227,7 @@ class GameScreen(ctk.CTkFrame):
             height=150
         )
         self.suggestions_listbox.pack(fill="x", expand=True)
+        self._create_suggestion_rows()
         
         # Controls frame
         self.controls_frame = ctk.CTkFrame(self)
@@ -256,6 +359,7 @@ class GameScreen(ctk.CTkFrame):
         
         # Get a random track
         random_index = random.randint(0, len(self.track_uris) - 1)
+        self.current_index = random_index
         self.current_track = self.track_uris[random_index]
         self.correct_answer = self.track_names[random_index]
         self.current_artist = self.track_artists[random_index]
@@ -268,7 +372,7 @@ class GameScreen(ctk.CTkFrame):
         # Calculate start time if random start is enabled
         start_time = 0
         if self.start_random:
-            track_duration = self.spotify_manager.get_track_duration(self.current_track)
+            track_duration = self._track_duration()
             if track_duration:
                 # Convert to milliseconds and ensure we have enough time for playback
                 max_start = int((track_duration - self.current_play_time) * 1000)
@@ -292,8 +396,19 @@ class GameScreen(ctk.CTkFrame):
         self.entry.focus_set()
         
         # Clear suggestions
+        self._suggestion_query = ""
+        self._cancel_suggestion_updates()
         self.clear_suggestions()
     
+    def _track_duration(self):
+        """Return the current track's duration in seconds, asking Spotify only if it wasn't loaded"""
+        duration = self.game_logic.track_durations.get(self.current_track)
+        if duration is None:
+            duration = self.game_logic.mapped_duration(self.track_uris, self.current_index)
+        if duration is None:
+            duration = self.spotify_manager.get_track_duration(self.current_track)
+        return duration
+    
     def replay_song(self):
         """Replay the current song with extended duration"""
         if self.replay_count < 5:
@@ -308,7 +423,7 @@ class GameScreen(ctk.CTkFrame):
             # Calculate start time if random start is enabled
             start_time = 0
             if self.start_random:
-                track_duration = self.spotify_manager.get_track_duration(self.current_track)
+                track_duration = self._track_duration()
                 if track_duration:
                     # Convert to milliseconds and ensure we have enough time for playback
                     max_start = int((track_duration - self.revealed_seconds) * 1000)
@@ -325,91 +440,204 @@ class GameScreen(ctk.CTkFrame):
                 self.title_label.configure(text="Error replaying track. Check your Spotify device.")
     
     def update_suggestions(self, event=None):
-        """Update the suggestions based on user input"""
-        query = self.entry.get().strip().lower()
+        """Schedule a suggestion update for the current input (debounced)"""
+        query = normalize_key(self._typed_text())
+        typed_char = bool(event is not None and event.char and event.char.isprintable())
         
-        # Clear previous suggestions
-        self.clear_suggestions()
+        # Modifier and navigation keys don't change the query
+        if query == self._suggestion_query and not typed_char:
+            return
+        self._suggestion_query = query
+        
+        # Invalidate any update that is still waiting or running
+        self._cancel_suggestion_updates()
         
         if not query:
+            self.clear_suggestions()
             return
         
-        # Build list of song suggestions
-        all_full_names = list(set([
-            f"{name} by {artist}"
-            for name, artist in zip(
-                self.track_names + [self.correct_answer],
-                self.track_artists + [self.current_artist]
-            )
-        ]))
-        
-        # Get filtering function for current game mode
-        filter_func = self.game_logic.get_game_mode_rules(self.game_settings[0])
-        
-        # Filter suggestions
-        matched = [item for item in all_full_names if filter_func(query, item.lower())]
-        matched.sort()  # Sort alphabetically
-        
-        # Create buttons for each suggestion
-        if matched:
-            for i, suggestion in enumerate(matched[:10]):  # Limit to 10 suggestions
-                suggestion_button = ctk.CTkButton(
-                    self.suggestions_listbox,
-                    text=suggestion,
-                    anchor="w",
-                    fg_color="transparent",
-                    text_color=("gray10", "gray90"),
-                    hover_color=("gray80", "gray30"),
-                    height=30,
-                    command=lambda s=suggestion: self._on_suggestion_click(s)
-                )
-                suggestion_button.pack(fill="x", padx=5, pady=2)
-                
-                # Store reference to button
-                self.suggestion_buttons.append(suggestion_button)
-                
-                # Bind keyboard navigation
-                suggestion_button.bind("<Up>", 
-                    lambda e, idx=i: self._on_suggestion_key_press(e, idx, -1))
-                suggestion_button.bind("<Down>", 
-                    lambda e, idx=i: self._on_suggestion_key_press(e, idx, 1))
-                suggestion_button.bind("<Return>", 
-                    lambda e, s=suggestion: self._on_suggestion_enter(e, s))
-        elif len(query) >= 3:
-            # Show "no matches" message if query is long enough
-            no_match_label = ctk.CTkLabel(
-                self.suggestions_listbox,
-                text=f"No matches for '{query}'",
-                fg_color="transparent",
-                text_color=("gray50", "gray70"),
-                anchor="w",
-                height=30
-            )
-            no_match_label.pack(fill="x", padx=10, pady=10)
+        generation = self._suggestion_generation
+        self._suggestion_after_id = self.after(
+            SUGGESTION_DEBOUNCE_MS,
+            lambda: self._start_suggestion_worker(generation, query, typed_char)
+        )
+    
+    def _cancel_suggestion_updates(self):
+        """Drop pending and in-flight suggestion updates"""
+        self._suggestion_generation += 1
+        if self._suggestion_after_id is not None:
+            self.after_cancel(self._suggestion_after_id)
+            self._suggestion_after_id = None
+    
+    def _start_suggestion_worker(self, generation, query, typed_char):
+        """Compute suggestions off the main thread once typing has paused"""
+        self._suggestion_after_id = None
+        threading.Thread(
+            target=self._compute_suggestions,
+            args=(generation, self.game_settings[0], query, typed_char),
+            daemon=True
+        ).start()
+    
+    def _compute_suggestions(self, generation, mode, query, typed_char):
+        """Match the query against the catalog in a background thread"""
+        try:
+            if generation != self._suggestion_generation:
+                return
             
-            # Add hint based on game mode
-            if self.game_settings[0] == "Normal":
-                hint_text = "Try a different spelling or shorter input"
-            elif self.game_settings[0] == "Hard":
-                hint_text = "Exact match needed (±1 error)"
-            elif self.game_settings[0] == "Harder":
-                hint_text = "Exact song title needed"
-            else:  # Expert mode
-                hint_text = "Exact 'title by artist' needed"
-                
-            hint_label = ctk.CTkLabel(
+            # Get the compiled filtering rule for current game mode
+            rule = self.game_logic.get_game_mode_rules(mode)
+            
+            # Filter suggestions (only the index candidates go through the mode rule)
+            # and keep the most relevant ones, reusing earlier results when possible
+            cache_key = (mode, query, self.suggestion_index.fingerprint)
+            matched = self.suggestion_cache.get(cache_key)
+            if matched is None:
+                matched = self.suggestion_index.match(rule, query, limit=MAX_SUGGESTIONS)
+                self.suggestion_cache.put(cache_key, matched)
+            
+            # Inline completion only when a character was typed (not on deletions)
+            completion = None
+            if matched and typed_char:
+                completion = self.suggestion_index.complete(rule, query)
+            
+            if generation == self._suggestion_generation:
+                self.after(0, lambda: self._show_suggestions(generation, query, matched, completion))
+        except Exception as e:
+            print(f"Error computing suggestions: {e}")
+    
+    def _show_suggestions(self, generation, query, matched, completion):
+        """Display a computed result set if it is still the newest one"""
+        if generation != self._suggestion_generation:
+            return
+        
+        if completion:
+            self._show_completion(query, completion)
+        
+        # Fill the pooled rows; the "no matches" rows only for long enough queries
+        self._set_suggestion_rows(matched)
+        if matched or len(query) < 3:
+            self._hide_no_match_rows()
+        else:
+            self._show_no_match_rows(query)
+    
+    def _create_suggestion_rows(self):
+        """Create the fixed pool of suggestion rows reused by every update"""
+        self.suggestion_pool = []
+        for i in range(MAX_SUGGESTIONS):
+            suggestion_button = ctk.CTkButton(
                 self.suggestions_listbox,
-                text=hint_text,
-                fg_color="transparent", 
-                text_color=("#1DB954", "#1DB954"),
+                text="",
                 anchor="w",
-                height=20
+                fg_color="transparent",
+                text_color=("gray10", "gray90"),
+                hover_color=("gray80", "gray30"),
+                height=30,
+                command=lambda idx=i: self._on_suggestion_click(self._suggestion_text(idx))
             )
-            hint_label.pack(fill="x", padx=10, pady=(0,10))
             
-            # Store reference to clean up later
-            self.suggestion_buttons.append(no_match_label)
-            self.suggestion_buttons.append(hint_label)
+            # Bind keyboard navigation
+            suggestion_button.bind("<Up>", 
+                lambda e, idx=i: self._on_suggestion_key_press(e, idx, -1))
+            suggestion_button.bind("<Down>", 
+                lambda e, idx=i: self._on_suggestion_key_press(e, idx, 1))
+            suggestion_button.bind("<Return>", 
+                lambda e, idx=i: self._on_suggestion_enter(e, self._suggestion_text(idx)))
+            
+            self.suggestion_pool.append(suggestion_button)
+        self.visible_suggestion_rows = 0
+        
+        # "No matches" message and mode hint, shown instead of the rows
+        self.no_match_label = ctk.CTkLabel(
+            self.suggestions_listbox,
+            text="",
+            fg_color="transparent",
+            text_color=("gray50", "gray70"),
+            anchor="w",
+            height=30
+        )
+        self.hint_label = ctk.CTkLabel(
+            self.suggestions_listbox,
+            text="",
+            fg_color="transparent", 
+            text_color=("#1DB954", "#1DB954"),
+            anchor="w",
+            height=20
+        )
+        self.no_match_visible = False
+    
+    def _suggestion_text(self, index):
+        """Return the suggestion currently shown in a pooled row"""
+        return self.suggestion_pool[index].cget("text")
+    
+    def _set_suggestion_rows(self, suggestions):
+        """Show suggestions in the first pooled rows and hide the rest"""
+        for i, suggestion_button in enumerate(self.suggestion_pool):
+            if i < len(suggestions):
+                suggestion_button.configure(
+                    text=suggestions[i],
+                    fg_color="transparent",
+                    text_color=("gray10", "gray90")
+                )
+                # Rows already on screen keep their place; new ones go below them
+                if i >= self.visible_suggestion_rows:
+                    suggestion_button.pack(fill="x", padx=5, pady=2)
+            elif i < self.visible_suggestion_rows:
+                suggestion_button.pack_forget()
+        
+        self.visible_suggestion_rows = len(suggestions)
+        self.suggestion_buttons = self.suggestion_pool[:len(suggestions)]
+        self.current_suggestion_index = -1
+    
+    def _show_no_match_rows(self, query):
+        """Show the "no matches" message with a hint for the current mode"""
+        # Add hint based on game mode
+        if self.game_settings[0] == "Normal":
+            hint_text = "Try a different spelling or shorter input"
+        elif self.game_settings[0] == "Hard":
+            hint_text = "Exact match needed (±1 error)"
+        elif self.game_settings[0] == "Harder":
+            hint_text = "Exact song title needed"
+        else:  # Expert mode
+            hint_text = "Exact 'title by artist' needed"
+        
+        self.no_match_label.configure(text=f"No matches for '{query}'")
+        self.hint_label.configure(text=hint_text)
+        if not self.no_match_visible:
+            self.no_match_label.pack(fill="x", padx=10, pady=10)
+            self.hint_label.pack(fill="x", padx=10, pady=(0,10))
+            self.no_match_visible = True
+    
+    def _hide_no_match_rows(self):
+        """Hide the "no matches" message and hint"""
+        if self.no_match_visible:
+            self.no_match_label.pack_forget()
+            self.hint_label.pack_forget()
+            self.no_match_visible = False
+    
+    def _typed_text(self):
+        """Return the entry text without a still-selected inline completion"""
+        text = self.entry.get()
+        if self.entry.select_present() and self.entry.index("sel.last") == len(text):
+            return text[:self.entry.index("sel.first")]
+        return text
+    
+    def _show_completion(self, query, completion):
+        """Append the rest of the matches' common completion as selected ghost text"""
+        typed = self._typed_text()
+        if normalize_key(typed) != query or typed != typed.rstrip():
+            return
+        
+        # The completion is display text; skip the part the query already covers
+        ghost = completion[key_prefix_length(completion, query, trailing_punctuation=False):]
+        if not normalize_key(ghost):
+            return
+        
+        # Replace any previous ghost text, then select the new one so the
+        # next keystroke overwrites it
+        self.entry.delete(len(typed), "end")
+        self.entry.insert("end", ghost)
+        self.entry.select_range(len(typed), "end")
+        self.entry.icursor(len(typed))
     
     def _on_suggestion_click(self, suggestion):
         """Wrapper for suggestion click to improve responsiveness"""
@@ -444,13 +672,9 @@ class GameScreen(ctk.CTkFrame):
     
     def clear_suggestions(self):
         """Clear all suggestions"""
-        # Remove all suggestion buttons
-        for button in self.suggestion_buttons:
-            button.destroy()
-        self.suggestion_buttons = []
-        
-        # Reset suggestion index
-        self.current_suggestion_index = -1
+        # Hide the pooled rows (this also resets the suggestion index)
+        self._set_suggestion_rows([])
+        self._hide_no_match_rows()
     
     def select_suggestion(self, suggestion):
         """Select a suggestion and fill the entry"""
@@ -561,6 +785,8 @@ class GameScreen(ctk.CTkFrame):
         
         # Clear entry & suggestions
         self.entry.delete(0, "end")
+        self._suggestion_query = ""
+        self._cancel_suggestion_updates()
         self.clear_suggestions()
         self.entry.focus_set()
     
@@ -5,10 +5,12 @@ import re
 import os
 import threading
 import urllib.request
+from functools import partial
 from io import BytesIO
 from PIL import Image, ImageTk
 import customtkinter as ctk
 from urllib.parse import urlparse
+from spotify_manager import PLAYLIST_INFO_FIELDS, PLAYLIST_TRACK_FIELDS, iter_pages
 
 class StartScreen(ctk.CTkFrame):
     """Playlist selection screen for the Spotify Guessing Game"""
@@ -600,7 +602,7 @@ class StartScreen(ctk.CTkFrame):
         """Fetch custom playlist info"""
         try:
             # Get playlist info from Spotify
-            playlist_info = self.game_logic.sp.playlist(playlist_id)
+            playlist_info = self.game_logic.sp.playlist(playlist_id, fields=PLAYLIST_INFO_FIELDS)
             
             # Extract relevant info
             name = playlist_info['name']
@@ -699,7 +701,7 @@ class StartScreen(ctk.CTkFrame):
         """Fetch playlist info in background"""
         try:
             # Get playlist details from Spotify
-            playlist_info = self.game_logic.sp.playlist(playlist_id)
+            playlist_info = self.game_logic.sp.playlist(playlist_id, fields=PLAYLIST_INFO_FIELDS)
             
             # Extract info
             name = playlist_info['name']
@@ -971,13 +973,17 @@ class StartScreen(ctk.CTkFrame):
             
             print(f"Starting game with playlist_id: {playlist_id}, settings: {game_settings}")
             
+            # Set when the tracks come from a catalog that keeps loading after the first page
+            catalog = None
+            
             # Call the correct method based on what's available
             if playlist_id == "liked_songs":
                 print("Fetching liked songs...")
                 # Need to handle liked songs specially
                 try:
-                    track_uris, track_names, track_artists = self.game_logic._get_liked_songs()
-                    print(f"Got {len(track_uris) if track_uris else 0} liked songs")
+                    catalog = self.game_logic.load_liked_songs_catalog(min_tracks=5)
+                    track_uris, track_names, track_artists = catalog.track_uris, catalog.track_names, catalog.track_artists
+                    print(f"Got {len(track_uris)} liked songs, loading the rest in the background")
                 except Exception as e:
                     print(f"Error fetching liked songs: {e}")
                     # Try alternative method
@@ -1041,10 +1047,11 @@ class StartScreen(ctk.CTkFrame):
                 # Try using get_playlist_tracks with default playlist name
                 print(f"Fetching playlist with id {playlist_id}")
                 
-                # First try _get_playlist_tracks_by_id
+                # First try loading by ID (the first page is enough to start)
                 try:
-                    track_uris, track_names, track_artists = self.game_logic._get_playlist_tracks_by_id(playlist_id)
-                    print(f"Successfully got {len(track_uris)} tracks by ID")
+                    catalog = self.game_logic.load_playlist_catalog(playlist_id, min_tracks=5)
+                    track_uris, track_names, track_artists = catalog.track_uris, catalog.track_names, catalog.track_artists
+                    print(f"Successfully got {len(track_uris)} tracks by ID, loading the rest in the background")
                 except Exception as direct_e:
                     print(f"Failed to get by ID: {direct_e}, trying alternative methods")
                     
@@ -1062,24 +1069,10 @@ class StartScreen(ctk.CTkFrame):
                         
                         # Direct Spotify API call as last resort
                         try:
-                            results = self.game_logic.sp.playlist_items(
-                                playlist_id, 
-                                fields="items.track(name,uri,artists)",
-                                limit=50
-                            )
+                            track_uris, track_names, track_artists = self._fetch_playlist_tracks(playlist_id)
                             
-                            if 'items' in results and results['items']:
-                                print(f"Got {len(results['items'])} tracks directly from Spotify API")
-                                track_uris = []
-                                track_names = []
-                                track_artists = []
-                                for item in results['items']:
-                                    if 'track' in item and item['track']:
-                                        track = item['track']
-                                        track_uris.append(track['uri'])
-                                        track_names.append(track['name'])
-                                        artists = ", ".join([a['name'] for a in track['artists']])
-                                        track_artists.append(artists)
+                            if track_uris:
+                                print(f"Got {len(track_uris)} tracks directly from Spotify API")
                             else:
                                 raise Exception("No tracks found in playlist")
                         except Exception as spotify_e:
@@ -1098,8 +1091,8 @@ class StartScreen(ctk.CTkFrame):
                 return
             
             # Launch game in main thread
-            self.after(0, lambda u=track_uris, n=track_names, a=track_artists, m=game_settings: 
-            self._launch_game(u, n, a, m))
+            self.after(0, lambda u=track_uris, n=track_names, a=track_artists, m=game_settings, c=catalog: 
+            self._launch_game(u, n, a, m, c))
             
         except Exception as e:
             error_msg = f"Error starting game with default playlist: {str(e)}"
@@ -1115,60 +1108,24 @@ class StartScreen(ctk.CTkFrame):
             
             # Try different approaches to get tracks
             try:
-                # First try the direct method if available
-                if hasattr(self.game_logic, '_get_playlist_tracks_by_id'):
-                    track_uris, track_names, track_artists = self.game_logic._get_playlist_tracks_by_id(playlist_id)
-                    if track_uris and len(track_uris) >= 5:
-                        self.after(0, lambda u=track_uris, n=track_names, a=track_artists, m=game_settings: 
-                        self._launch_game(u, n, a, m))
+                # First try the direct method if available (the first page is enough to start)
+                if hasattr(self.game_logic, 'load_playlist_catalog'):
+                    catalog = self.game_logic.load_playlist_catalog(playlist_id, min_tracks=5)
+                    if len(catalog) >= 5:
+                        self.after(0, lambda c=catalog, m=game_settings: 
+                        self._launch_game(c.track_uris, c.track_names, c.track_artists, m, c))
                         return
             except Exception as inner_e:
                 print(f"First method failed: {inner_e}. Trying alternative...")
             
             # Fetch tracks directly from Spotify if the first method failed
-            limit = 100
-            offset = 0
-            results = self.game_logic.sp.playlist_items(
-                playlist_id,
-                fields="items.track(name,uri,artists),next",
-                limit=limit,
-                offset=offset
-            )
-
-            if not results or 'items' not in results or len(results['items']) < 5:
-                error_msg = "Not enough tracks in playlist (need at least 5)"
-                print(f"Error: {error_msg}")
-                self.after(0, lambda msg=error_msg: self._show_error(msg))
-                return
-
-            # Extract track details and handle pagination
-            tracks = []
-            while True:
-                for item in results['items']:
-                    if item['track'] and item['track'].get('uri'):
-                        tracks.append(item['track'])
-
-                if results.get('next'):
-                    offset += limit
-                    results = self.game_logic.sp.playlist_items(
-                        playlist_id,
-                        fields="items.track(name,uri,artists),next",
-                        limit=limit,
-                        offset=offset
-                    )
-                else:
-                    break
+            track_uris, track_names, track_artists = self._fetch_playlist_tracks(playlist_id)
             
-            if len(tracks) < 5:
+            if len(track_uris) < 5:
                 error_msg = "Not enough playable tracks (need at least 5)"
                 print(f"Error: {error_msg}")
                 self.after(0, lambda msg=error_msg: self._show_error(msg))
                 return
-                
-            # Prepare track data
-            track_uris = [t['uri'] for t in tracks]
-            track_names = [t['name'] for t in tracks]
-            track_artists = [", ".join([a['name'] for a in t['artists']]) for t in tracks]
             
             # Launch game in main thread
             self.after(0, lambda u=track_uris, n=track_names, a=track_artists, m=game_settings: 
@@ -1180,8 +1137,25 @@ class StartScreen(ctk.CTkFrame):
             # Pass the error message directly in the lambda to avoid scope issues
             self.after(0, lambda msg=error_msg: self._show_error(f"Error: {msg}"))
     
-    def _launch_game(self, track_uris, track_names, track_artists, game_settings):
-        """Launch the game with the loaded tracks"""
+    def _fetch_playlist_tracks(self, playlist_id):
+        """Fetch a playlist's tracks directly from Spotify, extracting each page as it arrives"""
+        track_uris = []
+        track_names = []
+        track_artists = []
+        
+        fetch_page = partial(self.game_logic.sp.playlist_items, playlist_id, fields=PLAYLIST_TRACK_FIELDS)
+        for items in iter_pages(fetch_page, 100):
+            for item in items:
+                track = item['track']
+                if track and track.get('uri'):
+                    track_uris.append(track['uri'])
+                    track_names.append(track['name'])
+                    track_artists.append(", ".join([a['name'] for a in track['artists']]))
+        
+        return track_uris, track_names, track_artists
+    
+    def _launch_game(self, track_uris, track_names, track_artists, game_settings, catalog=None):
+        """Launch the game with the loaded tracks (catalog: the TrackCatalog still filling them, if any)"""
         print(f"Launching game with {len(track_uris)} tracks in settings: {game_settings}")
         # Call the parent method to start the game
         try:
@@ -1199,7 +1173,7 @@ class StartScreen(ctk.CTkFrame):
             if hasattr(self.parent, 'start_game'):
                 self.parent.start_game(track_uris, track_names, track_artists, game_settings)
             elif hasattr(self.parent, 'show_game_screen'):
-                self.parent.show_game_screen(track_uris, track_names, track_artists, game_settings)
+                self.parent.show_game_screen(track_uris, track_names, track_artists, game_settings, catalog=catalog)
             else:
                 raise Exception("Parent object has no method to start the game")
         except Exception as e: